@@ -1,11 +1,8 @@
-from . import ui
-from . import register_quadgrab
-from . import overlay
-from . import ops as operators
-from . import properties
-import bpy
-import sys
 import importlib
+import sys
+
+from . import register_quadgrab
+
 bl_info = {
     "name": "LKS QuadGrab",
     "author": "LKS",
@@ -1,8 +1,8 @@
 """ops – Blender operator package for lks_quadgrab.
 
-Re-exports every operator class and registers/unregisters them via the
-standard ``register()`` / ``unregister()`` interface expected by
-``__init__.py``.
+Re-exports every operator class.  ``opsToRegister`` is registered in one
+batch with the rest of the addon's classes by ``register_quadgrab``; the
+``register()`` / ``unregister()`` pair here is kept for standalone use.
 
 Utility (non-operator) symbols are also re-exported here so that any test
 or external code that previously imported from ``lks_quadgrab.operators``
@@ -11,6 +11,8 @@ continues to work after changing to ``lks_quadgrab.ops``.
 
 from __future__ import annotations
 
+import importlib
+
 import bpy
 
 from .object_ot_lks_quadgrab import OBJECT_OT_lks_quad_grab
@@ -32,10 +34,24 @@ from ..util.quadgrab_helpers import (  # noqa: F401
     get_scene_issues,
     _get_compositor_tree,
 )
-from ..util.comp_graph import build_comp_graph  # noqa: F401
-from ..util.pbr_aovs import setup_pbr_aovs_mats  # noqa: F401
 from ..util.scene_setup import apply_quadgrab_setup, restore_quadgrab  # noqa: F401
 
+# The compositor / material builders are only needed once a grab runs, so
+# these re-exports are resolved on first access (PEP 562) instead of at
+# import.  name -> module under ``..util``.
+_LAZY_REEXPORTS: dict[str, str] = {
+    "build_comp_graph": "comp_graph",
+    "setup_pbr_aovs_mats": "pbr_aovs",
+}
+
+
+def __getattr__(name: str) -> object:
+    module_name: str | None = _LAZY_REEXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f"..util.{module_name}", __name__)
+    return getattr(module, name)
+
 # Ordered registration list.
 opsToRegister: tuple[type[bpy.types.Operator], ...] = (
     OBJECT_OT_lks_quad_grab_setup,
@@ -49,11 +65,4 @@ opsToRegister: tuple[type[bpy.types.Operator], ...] = (
 )
 
 
-def register() -> None:
-    for cls in opsToRegister:
-        bpy.utils.register_class(cls)
-
-
-def unregister() -> None:
-    for cls in reversed(opsToRegister):
-        bpy.utils.unregister_class(cls)
+register, unregister = bpy.utils.register_classes_factory(opsToRegister)
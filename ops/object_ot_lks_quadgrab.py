@@ -7,12 +7,13 @@ import os
 import time
 
 import bpy
-import mathutils
 from mathutils import Vector
 
 from .. import properties
-from ..util.quadgrab_helpers import CLIP_START, _rendered_filepath
-from ..util.scene_setup import apply_quadgrab_setup, restore_quadgrab
+from ..util.quadgrab_helpers import CLIP_START, _rendered_filepath_abs
+from ..util.scene_setup import _QGCache, apply_quadgrab_setup, restore_quadgrab
+
+_PLANE_NAME: str = "QuadGrab Reference Plane"
 
 
 class OBJECT_OT_lks_quad_grab(bpy.types.Operator):
@@ -32,7 +33,7 @@ class OBJECT_OT_lks_quad_grab(bpy.types.Operator):
                 "Save the .blend file first (output path uses '//' prefix)")
             return False
         has_plane: bool = bpy.data.objects.get(
-            "QuadGrab Reference Plane") is not None
+            _PLANE_NAME) is not None
         has_mesh_sel: bool = (
             context.active_object is not None
             and context.active_object.type == 'MESH'
@@ -68,14 +69,14 @@ class OBJECT_OT_lks_quad_grab(bpy.types.Operator):
         # --- Resolve the QuadGrab Reference Plane -----------------------
         # If no plane exists yet but a mesh is selected, auto-spawn it now.
         ref_obj: bpy.types.Object | None = bpy.data.objects.get(
-            "QuadGrab Reference Plane")
+            _PLANE_NAME)
         if ref_obj is None:
             result = bpy.ops.object.lks_quad_grab_make_plane()
             if 'CANCELLED' in result:
                 self.report(
                     {'ERROR'}, "Failed to create QuadGrab Reference Plane")
                 return {'CANCELLED'}
-            ref_obj = bpy.data.objects.get("QuadGrab Reference Plane")
+            ref_obj = bpy.data.objects.get(_PLANE_NAME)
         if ref_obj is None:
             self.report(
                 {'ERROR'}, "QuadGrab Reference Plane not found after creation")
@@ -150,7 +151,7 @@ class OBJECT_OT_lks_quad_grab(bpy.types.Operator):
         # ----------------------------------------------------------------
         # Atomic: setup → render → restore (restore guaranteed by finally)
         # ----------------------------------------------------------------
-        cache: dict[str, object] = {}
+        cache: _QGCache | None = None
         skipped_linked: int = 0
         try:
             cache, skipped_linked = apply_quadgrab_setup(scene, vl, timestamp)
@@ -294,9 +295,8 @@ class OBJECT_OT_lks_quad_grab(bpy.types.Operator):
                     elif hasattr(disp_tex, "extension"):
                         disp_tex.extension = 'EXTEND'
                     disp_img: bpy.types.Image = bpy.data.images.load(
-                        filepath=_rendered_filepath(
-                            getattr(scene, properties.PROP_OUTPUT_DIR),
-                            timestamp + "Depth_Raw", "exr"))
+                        filepath=_rendered_filepath_abs(
+                            _abs_dir, timestamp + "Depth_Raw", "exr"))
                     displace.texture = disp_tex
                     disp_tex.image = disp_img
 
@@ -311,10 +311,9 @@ class OBJECT_OT_lks_quad_grab(bpy.types.Operator):
             nt: bpy.types.NodeTree = mat.node_tree
             shader: bpy.types.ShaderNodeBsdfPrincipled = mat.node_tree.nodes["Principled BSDF"]
 
-            output_dir: str = getattr(scene, properties.PROP_OUTPUT_DIR)
             # BaseColor
             img_basecolor: bpy.types.Image = bpy.data.images.load(
-                filepath=_rendered_filepath(output_dir, timestamp + "BaseColor_srgb", "png"))
+                filepath=_rendered_filepath_abs(_abs_dir, timestamp + "BaseColor_srgb", "png"))
             n_img_basecolor: bpy.types.ShaderNodeTexImage = nt.nodes.new(
                 type="ShaderNodeTexImage")
             n_img_basecolor.name = "QG_BaseColor"
@@ -324,7 +323,7 @@ class OBJECT_OT_lks_quad_grab(bpy.types.Operator):
                 input=shader.inputs["Base Color"], output=n_img_basecolor.outputs[0])
             # Normal
             img_normal: bpy.types.Image = bpy.data.images.load(
-                filepath=_rendered_filepath(output_dir, timestamp + "Normal", "png"))
+                filepath=_rendered_filepath_abs(_abs_dir, timestamp + "Normal", "png"))
             n_img_normal: bpy.types.ShaderNodeTexImage = nt.nodes.new(
                 type="ShaderNodeTexImage")
             n_img_normal.name = "QG_Normal"
@@ -340,7 +339,7 @@ class OBJECT_OT_lks_quad_grab(bpy.types.Operator):
                 input=shader.inputs["Normal"], output=n_normal.outputs[0])
             # Roughness
             img_roughness: bpy.types.Image = bpy.data.images.load(
-                filepath=_rendered_filepath(output_dir, timestamp + "Roughness", "png"))
+                filepath=_rendered_filepath_abs(_abs_dir, timestamp + "Roughness", "png"))
             n_img_roughness: bpy.types.ShaderNodeTexImage = nt.nodes.new(
                 type="ShaderNodeTexImage")
             n_img_roughness.name = "QG_Roughness"
@@ -351,7 +350,7 @@ class OBJECT_OT_lks_quad_grab(bpy.types.Operator):
                 input=shader.inputs["Roughness"], output=n_img_roughness.outputs[0])
             # Metallic
             img_metallic: bpy.types.Image = bpy.data.images.load(
-                filepath=_rendered_filepath(output_dir, timestamp + "Metallic", "png"))
+                filepath=_rendered_filepath_abs(_abs_dir, timestamp + "Metallic", "png"))
             n_img_metallic: bpy.types.ShaderNodeTexImage = nt.nodes.new(
                 type="ShaderNodeTexImage")
             n_img_metallic.name = "QG_Metallic"
@@ -362,7 +361,7 @@ class OBJECT_OT_lks_quad_grab(bpy.types.Operator):
                 input=shader.inputs["Metallic"], output=n_img_metallic.outputs[0])
             # Specular
             img_specular: bpy.types.Image = bpy.data.images.load(
-                filepath=_rendered_filepath(output_dir, timestamp + "Specular", "png"))
+                filepath=_rendered_filepath_abs(_abs_dir, timestamp + "Specular", "png"))
             n_img_specular: bpy.types.ShaderNodeTexImage = nt.nodes.new(
                 type="ShaderNodeTexImage")
             n_img_specular.name = "QG_Specular"
@@ -380,7 +379,7 @@ class OBJECT_OT_lks_quad_grab(bpy.types.Operator):
             if hasattr(mat, "blend_method"):
                 mat.blend_method = "CLIP"
             img_alpha: bpy.types.Image = bpy.data.images.load(
-                filepath=_rendered_filepath(output_dir, timestamp + "Alpha", "png"))
+                filepath=_rendered_filepath_abs(_abs_dir, timestamp + "Alpha", "png"))
             n_img_alpha: bpy.types.ShaderNodeTexImage = nt.nodes.new(
                 type="ShaderNodeTexImage")
             n_img_alpha.name = "QG_Alpha"
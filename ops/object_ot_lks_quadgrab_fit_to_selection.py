@@ -7,10 +7,8 @@ the correct centroid and size while keeping the plane's rotation unchanged.
 
 from __future__ import annotations
 
-import math
-
 import bpy
-from mathutils import Euler, Matrix, Quaternion, Vector
+from mathutils import Euler, Quaternion, Vector
 
 from .. import properties
 
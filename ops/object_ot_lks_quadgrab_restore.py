@@ -2,12 +2,9 @@
 
 from __future__ import annotations
 
-import json
-
 import bpy
 from .. import properties
-from ..util.quadgrab_helpers import _QG_NODE_PREFIX
-from ..util.scene_setup import restore_quadgrab
+from ..util.scene_setup import _QGCache, _cache_from_json, restore_quadgrab
 
 
 class OBJECT_OT_lks_quad_grab_restore(bpy.types.Operator):
@@ -26,35 +23,33 @@ class OBJECT_OT_lks_quad_grab_restore(bpy.types.Operator):
 
         # Read cache written by Setup (or empty if Setup was never run).
         cached: str = getattr(scene, properties.PROP_CACHED_SETTINGS, "")
-        cache: dict[str, object] = json.loads(cached) if cached else {}
+        cache: _QGCache | None = _cache_from_json(cached)
 
         # Restore render settings + remove QG_ compositor/AOV/material nodes.
-        restore_quadgrab(scene, vl, cache)
-        if cache:
+        restore_quadgrab(scene, vl, cache, force=True)
+        if cached:
             setattr(scene, properties.PROP_CACHED_SETTINGS, "")
 
         # Remove QuadGrab objects, textures, images, and any QG_ materials.
-        for obj in list(bpy.data.objects):
-            if "QuadGrab" in obj.name:
-                bpy.data.objects.remove(obj, do_unlink=True)
-
-        for texture in list(bpy.data.textures):
-            if "QuadGrab" in texture.name:
-                bpy.data.textures.remove(texture, do_unlink=True)
-
-        for image in list(bpy.data.images):
-            if "QuadGrab" in image.name:
-                bpy.data.images.remove(image, do_unlink=True)
-
-        for mat in list(bpy.data.materials):
-            if mat.library is not None:
-                continue  # linked — skip
-            if "QG_" in mat.name:
-                bpy.data.materials.remove(mat, do_unlink=True)
-
-        for s in list(bpy.data.scenes):
-            if "quadgrab" in s.name:
-                bpy.data.scenes.remove(s, do_unlink=True)
+        # Each collection is filtered in one pass first; only the matches
+        # are copied, and removing them doesn't disturb the iteration.
+        data = bpy.data
+        for obj in [o for o in data.objects if "QuadGrab" in o.name]:
+            data.objects.remove(obj, do_unlink=True)
+
+        for texture in [t for t in data.textures if "QuadGrab" in t.name]:
+            data.textures.remove(texture, do_unlink=True)
+
+        for image in [i for i in data.images if "QuadGrab" in i.name]:
+            data.images.remove(image, do_unlink=True)
+
+        # Linked materials are read-only — skip them.
+        for mat in [m for m in data.materials
+                    if m.library is None and "QG_" in m.name]:
+            data.materials.remove(mat, do_unlink=True)
+
+        for s in [sc for sc in data.scenes if "quadgrab" in sc.name]:
+            data.scenes.remove(s, do_unlink=True)
 
         bpy.ops.outliner.orphans_purge(do_recursive=True)
 
@@ -2,12 +2,11 @@
 
 from __future__ import annotations
 
-import json
 import time
 
 import bpy
 from .. import properties
-from ..util.scene_setup import apply_quadgrab_setup
+from ..util.scene_setup import _cache_to_json, apply_quadgrab_setup
 
 
 class OBJECT_OT_lks_quad_grab_setup(bpy.types.Operator):
@@ -31,7 +30,7 @@ class OBJECT_OT_lks_quad_grab_setup(bpy.types.Operator):
         cache, skipped_linked = apply_quadgrab_setup(scene, vl, timestamp)
 
         # Persist the cache so the Cleanup operator can restore original settings.
-        setattr(scene, properties.PROP_CACHED_SETTINGS, json.dumps(cache))
+        setattr(scene, properties.PROP_CACHED_SETTINGS, _cache_to_json(cache))
 
         if skipped_linked > 0:
             self.report(
@@ -25,6 +25,8 @@ from mathutils import Vector
 
 from . import properties
 
+_PLANE_NAME: str = "QuadGrab Reference Plane"
+
 # ---------------------------------------------------------------------------
 # Colours
 # ---------------------------------------------------------------------------
@@ -88,7 +90,7 @@ def _draw_capture_volume() -> None:
         context.view_layer.objects.active
         if hasattr(context, 'view_layer') else None
     )
-    if obj is None or obj.name != "QuadGrab Reference Plane":
+    if obj is None or obj.name != _PLANE_NAME:
         return
 
     max_depth: float = getattr(scene, properties.PROP_MAX_DEPTH, 10.0)
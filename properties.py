@@ -25,106 +25,109 @@ PROP_FIT_MARGIN = "lks_quadgrab_fit_margin"
 PROP_LAST_GRAB_PREFIX = "lks_quadgrab_last_grab_prefix"
 
 
-def register() -> None:
-    setattr(bpy.types.Scene, PROP_OUTPUT_DIR, bpy.props.StringProperty(
+# (name, property) for every Scene property the addon registers.  The
+# ``bpy.props`` descriptors are built once at import so register() only has
+# to attach them; register() / unregister() both walk this table.
+_PROPS: tuple[tuple[str, object], ...] = (
+    (PROP_OUTPUT_DIR, bpy.props.StringProperty(
         name="Image Export Path",
         subtype='DIR_PATH',
-        default='//quadgrab/'))
-
-    setattr(bpy.types.Scene, PROP_RENDER_SIZE, bpy.props.IntProperty(
+        default='//quadgrab/',
+    )),
+    (PROP_RENDER_SIZE, bpy.props.IntProperty(
         name="Resolution",
         description="Output Texture Size",
         default=128,
         soft_min=128,
         soft_max=8192,
-        step=64
-    ))
-    setattr(bpy.types.Scene, PROP_USE_TIMESTAMP, bpy.props.BoolProperty(
+        step=64,
+    )),
+    (PROP_USE_TIMESTAMP, bpy.props.BoolProperty(
         name="Use Timestamp",
         description="Enable Add Timestamp to filename",
-        default=False
-    ))
-    setattr(bpy.types.Scene, PROP_USE_DEPTH, bpy.props.BoolProperty(
+        default=False,
+    )),
+    (PROP_USE_DEPTH, bpy.props.BoolProperty(
         name="Depth",
         description="Output ZDepth",
-        default=True
-    ))
-    setattr(bpy.types.Scene, PROP_USE_DEPTH_EXR, bpy.props.BoolProperty(
+        default=True,
+    )),
+    (PROP_USE_DEPTH_EXR, bpy.props.BoolProperty(
         name="Z EXR 0-1",
         description="Output unitized (0-1) Z depth as EXR",
-        default=True
-    ))
-    setattr(bpy.types.Scene, PROP_USE_DEPTH_EXR_RAW, bpy.props.BoolProperty(
+        default=True,
+    )),
+    (PROP_USE_DEPTH_EXR_RAW, bpy.props.BoolProperty(
         name="Z EXR Raw",
         description="Output signed world-space Z depth as EXR (required for metrically accurate displacement)",
-        default=True
-    ))
-    setattr(bpy.types.Scene, PROP_USE_COMPOSITE, bpy.props.BoolProperty(
+        default=True,
+    )),
+    (PROP_USE_COMPOSITE, bpy.props.BoolProperty(
         name="Composite",
         description="Output Composite",
-        default=False
-    ))
-    setattr(bpy.types.Scene, PROP_USE_PBR, bpy.props.BoolProperty(
+        default=False,
+    )),
+    (PROP_USE_PBR, bpy.props.BoolProperty(
         name="PBR",
         description="Output PBR maps",
-        default=False
-    ))
-    setattr(bpy.types.Scene, PROP_MAX_DEPTH, bpy.props.FloatProperty(
+        default=False,
+    )),
+    (PROP_MAX_DEPTH, bpy.props.FloatProperty(
         name="MaxDepth",
         description="Max Depth for ZGrab",
-        default=10.0
-    ))
-    setattr(bpy.types.Scene, PROP_USE_PREVIEW_PLANE, bpy.props.BoolProperty(
+        default=10.0,
+    )),
+    (PROP_USE_PREVIEW_PLANE, bpy.props.BoolProperty(
         name="Create Preview Plane",
         description="Create a plane to preview generated textures",
-        default=False
-    ))
-    setattr(bpy.types.Scene, PROP_DISPLACE_PLANE, bpy.props.BoolProperty(
+        default=False,
+    )),
+    (PROP_DISPLACE_PLANE, bpy.props.BoolProperty(
         name="Displace Plane",
         description="If preview plane is created, displace it with zgrab?",
-        default=False
-    ))
-    setattr(bpy.types.Scene, PROP_USE_DEBUG, bpy.props.BoolProperty(
+        default=False,
+    )),
+    (PROP_USE_DEBUG, bpy.props.BoolProperty(
         name="Debug",
         description="Debug will disable removing of intermediate objects",
-        default=False
-    ))
-    setattr(bpy.types.Scene, PROP_CACHED_SETTINGS, bpy.props.StringProperty(
+        default=False,
+    )),
+    (PROP_CACHED_SETTINGS, bpy.props.StringProperty(
         name="Cached Settings",
         description="JSON cache of original scene settings before QuadGrab setup",
         default="",
         options={'HIDDEN'},
-    ))
-    setattr(bpy.types.Scene, PROP_SHOW_OVERLAY, bpy.props.BoolProperty(
+    )),
+    (PROP_SHOW_OVERLAY, bpy.props.BoolProperty(
         name="Show Capture Volume",
         description="Draw the QuadGrab capture-volume overlay in the viewport",
         default=True,
-    ))
-    setattr(bpy.types.Scene, PROP_DEBUG_EXPANDED, bpy.props.BoolProperty(
+    )),
+    (PROP_DEBUG_EXPANDED, bpy.props.BoolProperty(
         name="Debug",
         description="Expand the Debug section",
         default=False,
         options={'HIDDEN'},
-    ))
-    setattr(bpy.types.Scene, PROP_OUTPUT_EXPANDED, bpy.props.BoolProperty(
+    )),
+    (PROP_OUTPUT_EXPANDED, bpy.props.BoolProperty(
         name="Output Settings",
         description="Expand Output Settings",
         default=True,
         options={'HIDDEN'},
-    ))
-    setattr(bpy.types.Scene, PROP_GRAB_EXPANDED, bpy.props.BoolProperty(
+    )),
+    (PROP_GRAB_EXPANDED, bpy.props.BoolProperty(
         name="Grab Options",
         description="Expand Grab Options",
         default=True,
         options={'HIDDEN'},
-    ))
-    setattr(bpy.types.Scene, PROP_PREVIEW_EXPANDED, bpy.props.BoolProperty(
+    )),
+    (PROP_PREVIEW_EXPANDED, bpy.props.BoolProperty(
         name="Preview Options",
         description="Expand Preview Options",
         default=False,
         options={'HIDDEN'},
-    ))
-    setattr(bpy.types.Scene, PROP_DEPTH_MIDPOINT, bpy.props.FloatProperty(
+    )),
+    (PROP_DEPTH_MIDPOINT, bpy.props.FloatProperty(
         name="Depth Zero Offset",
         description=(
             "Shift the EXR depth zero-point into the capture volume. "
@@ -136,18 +139,18 @@ def register() -> None:
         min=0.0,
         max=1.0,
         subtype='FACTOR',
-    ))
-    setattr(bpy.types.Scene, PROP_OUTPUT_NAME, bpy.props.StringProperty(
+    )),
+    (PROP_OUTPUT_NAME, bpy.props.StringProperty(
         name="Name",
         description="Filename prefix for all outputs of this grab (overrides previous files when unchanged)",
         default="",
-    ))
-    setattr(bpy.types.Scene, PROP_FIT_FROM_VIEW, bpy.props.BoolProperty(
+    )),
+    (PROP_FIT_FROM_VIEW, bpy.props.BoolProperty(
         name="From View",
         description="Align the plane to the current viewport before fitting to selection",
         default=False,
-    ))
-    setattr(bpy.types.Scene, PROP_FIT_MARGIN, bpy.props.FloatProperty(
+    )),
+    (PROP_FIT_MARGIN, bpy.props.FloatProperty(
         name="Fit Margin",
         description=(
             "Expand the capture plane by this distance (metres) on every side when "
@@ -159,36 +162,23 @@ def register() -> None:
         min=0.0,
         soft_max=1.0,
         unit='LENGTH',
-    ))
-    setattr(bpy.types.Scene, PROP_LAST_GRAB_PREFIX, bpy.props.StringProperty(
+    )),
+    (PROP_LAST_GRAB_PREFIX, bpy.props.StringProperty(
         name="Last Grab Prefix",
         description="Filename prefix used by the most recent QuadGrab (used by Sculpt Alpha)",
         default="",
         options={'HIDDEN'},
-    ))
+    )),
+)
+
+
+def register() -> None:
+    scene_type = bpy.types.Scene
+    for name, prop in _PROPS:
+        setattr(scene_type, name, prop)
 
 
 def unregister() -> None:
-    delattr(bpy.types.Scene, PROP_OUTPUT_DIR)
-    delattr(bpy.types.Scene, PROP_RENDER_SIZE)
-    delattr(bpy.types.Scene, PROP_USE_TIMESTAMP)
-    delattr(bpy.types.Scene, PROP_USE_DEPTH)
-    delattr(bpy.types.Scene, PROP_USE_DEPTH_EXR)
-    delattr(bpy.types.Scene, PROP_USE_DEPTH_EXR_RAW)
-    delattr(bpy.types.Scene, PROP_USE_COMPOSITE)
-    delattr(bpy.types.Scene, PROP_USE_PBR)
-    delattr(bpy.types.Scene, PROP_MAX_DEPTH)
-    delattr(bpy.types.Scene, PROP_USE_PREVIEW_PLANE)
-    delattr(bpy.types.Scene, PROP_DISPLACE_PLANE)
-    delattr(bpy.types.Scene, PROP_USE_DEBUG)
-    delattr(bpy.types.Scene, PROP_CACHED_SETTINGS)
-    delattr(bpy.types.Scene, PROP_SHOW_OVERLAY)
-    delattr(bpy.types.Scene, PROP_DEBUG_EXPANDED)
-    delattr(bpy.types.Scene, PROP_OUTPUT_EXPANDED)
-    delattr(bpy.types.Scene, PROP_GRAB_EXPANDED)
-    delattr(bpy.types.Scene, PROP_PREVIEW_EXPANDED)
-    delattr(bpy.types.Scene, PROP_DEPTH_MIDPOINT)
-    delattr(bpy.types.Scene, PROP_OUTPUT_NAME)
-    delattr(bpy.types.Scene, PROP_FIT_FROM_VIEW)
-    delattr(bpy.types.Scene, PROP_FIT_MARGIN)
-    delattr(bpy.types.Scene, PROP_LAST_GRAB_PREFIX)
+    scene_type = bpy.types.Scene
+    for name, _prop in reversed(_PROPS):
+        delattr(scene_type, name)
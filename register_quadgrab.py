@@ -4,17 +4,28 @@ from . import properties
 from . import ops as operators
 from . import overlay
 from . import ui
+from .util import quadgrab_helpers
+
+# Every RNA class the addon registers, in registration order.  Registered in
+# one batch; overlay, ui and quadgrab_helpers only add handlers in their own
+# register().
+_CLASSES: tuple[type, ...] = operators.opsToRegister + ui.classesToRegister
+
+_register_classes, _unregister_classes = bpy.utils.register_classes_factory(
+    _CLASSES)
 
 
 def register_addon() -> None:
     properties.register()
-    operators.register()
+    _register_classes()
     overlay.register()
     ui.register()
+    quadgrab_helpers.register()
 
 
 def unregister_addon() -> None:
+    quadgrab_helpers.unregister()
     ui.unregister()
     overlay.unregister()
-    operators.unregister()
+    _unregister_classes()
     properties.unregister()
@@ -3,6 +3,19 @@ import bpy
 from . import properties
 from . import ops as operators
 
+_PLANE_NAME: str = "QuadGrab Reference Plane"
+
+# Whether the current .blend has a filepath.  Refreshed by file load/save
+# handlers so draw() doesn't read bpy.data.filepath on every redraw; None
+# until first needed (bpy.data is restricted while the addon registers).
+_blend_saved: bool | None = None
+
+
+@bpy.app.handlers.persistent
+def _refresh_blend_saved(*_args: object) -> None:
+    global _blend_saved
+    _blend_saved = bool(bpy.data.filepath)
+
 
 class VIEW3D_PT_lks_quad_grab(bpy.types.Panel):
     bl_space_type = 'VIEW_3D'
@@ -11,17 +24,77 @@ class VIEW3D_PT_lks_quad_grab(bpy.types.Panel):
     bl_label = 'LKS QuadGrab'
 
     def _section(self, parent: bpy.types.UILayout, scene: bpy.types.Scene,
-                 prop_name: str, label: str, icon: str
-                 ) -> tuple[bpy.types.UILayout, bool]:
-        """Draw a collapsible box section.  Returns (box, is_expanded)."""
-        expanded: bool = getattr(scene, prop_name, True)
+                 prop_name: str, expanded: bool, label: str, icon: str
+                 ) -> bpy.types.UILayout:
+        """Draw a collapsible box section header and return its box.
+
+        *expanded* is the already-read value of *prop_name*; the caller only
+        fills the returned box when it is True.
+        """
         box: bpy.types.UILayout = parent.box()
         row: bpy.types.UILayout = box.row()
         row.prop(scene, prop_name,
                  icon='TRIA_DOWN' if expanded else 'TRIA_RIGHT',
                  icon_only=True, emboss=False)
         row.label(text=label, icon=icon)
-        return box, expanded
+        return box
+
+    # ── Section bodies (only called while the section is expanded) ──────
+
+    def _draw_output(self, box: bpy.types.UILayout,
+                     scene: bpy.types.Scene) -> None:
+        box.prop(scene, properties.PROP_OUTPUT_DIR, text="")
+        row = box.row(align=True)
+        row.prop(scene, properties.PROP_OUTPUT_NAME, text="Name")
+        row.prop(scene, properties.PROP_USE_TIMESTAMP, toggle=True)
+        row = box.row(align=True)
+        row.prop(scene, properties.PROP_RENDER_SIZE)
+        row.prop(scene, properties.PROP_MAX_DEPTH)
+
+    def _draw_grab(self, box: bpy.types.UILayout,
+                   scene: bpy.types.Scene) -> None:
+        grid = box.grid_flow(row_major=True, columns=5, align=True)
+        grid.prop(scene, properties.PROP_USE_DEPTH, text="Z", toggle=True)
+        grid.prop(scene, properties.PROP_USE_DEPTH_EXR,
+                  text="Z EXR 0-1", toggle=True)
+        grid.prop(scene, properties.PROP_USE_DEPTH_EXR_RAW,
+                  text="Z EXR Raw", toggle=True)
+        grid.prop(scene, properties.PROP_USE_COMPOSITE,
+                  text="Composite", toggle=True)
+        grid.prop(scene, properties.PROP_USE_PBR, text="PBR", toggle=True)
+        box.prop(scene, properties.PROP_DEPTH_MIDPOINT, slider=True)
+
+    def _draw_preview(self, box: bpy.types.UILayout,
+                      scene: bpy.types.Scene) -> None:
+        grid = box.grid_flow(row_major=True, columns=2, align=True)
+        grid.prop(scene, properties.PROP_USE_PREVIEW_PLANE, toggle=True)
+        grid.prop(scene, properties.PROP_DISPLACE_PLANE, toggle=True)
+        box.prop(scene, properties.PROP_SHOW_OVERLAY,
+                 text="Show Capture Volume", icon='OVERLAY')
+
+    def _draw_debug(self, box: bpy.types.UILayout,
+                    scene: bpy.types.Scene) -> None:
+        row_ops = box.row(align=True)
+        row_ops.operator(
+            operators.OBJECT_OT_lks_quad_grab_setup.bl_idname,
+            text="Setup", icon='PREFERENCES')
+        row_ops.operator(
+            operators.OBJECT_OT_lks_quad_grab_restore.bl_idname,
+            text="Cleanup", icon='TRASH')
+        box.prop(scene, properties.PROP_USE_DEBUG, toggle=True)
+
+    # (expanded prop, default, label, icon, body) for each collapsible
+    # section, in panel order.
+    _SECTIONS = (
+        (properties.PROP_OUTPUT_EXPANDED, True,
+         "Output Settings", 'OUTPUT', _draw_output),
+        (properties.PROP_GRAB_EXPANDED, True,
+         "Grab Options", 'CAMERA_DATA', _draw_grab),
+        (properties.PROP_PREVIEW_EXPANDED, False,
+         "Preview Options", 'HIDE_OFF', _draw_preview),
+        (properties.PROP_DEBUG_EXPANDED, False,
+         "Debug", 'TOOL_SETTINGS', _draw_debug),
+    )
 
     def draw(self, context: bpy.types.Context) -> None:
         layout = self.layout
@@ -32,14 +105,17 @@ class VIEW3D_PT_lks_quad_grab(bpy.types.Panel):
 
         output_dir: str = getattr(
             scene, properties.PROP_OUTPUT_DIR, "//quadgrab/")
-        path_bad: bool = output_dir.startswith("//") and not bpy.data.filepath
-        has_plane: bool = bpy.data.objects.get(
-            "QuadGrab Reference Plane") is not None
-        has_mesh_sel: bool = (
-            context.active_object is not None
-            and context.active_object.type == 'MESH'
-        )
-        no_target: bool = not has_plane and not has_mesh_sel
+        if _blend_saved is None:
+            _refresh_blend_saved()
+        path_bad: bool = output_dir.startswith("//") and not _blend_saved
+        plane_obj: bpy.types.Object | None = bpy.data.objects.get(
+            _PLANE_NAME)
+        # The active-mesh fallback only matters without a plane, so skip the
+        # active-object reads whenever the plane exists.
+        no_target: bool = False
+        if plane_obj is None:
+            active_obj: bpy.types.Object | None = context.active_object
+            no_target = active_obj is None or active_obj.type != 'MESH'
 
         row_qg = col.row(align=True)
         row_qg.scale_y = 1.6
@@ -71,78 +147,49 @@ class VIEW3D_PT_lks_quad_grab(bpy.types.Panel):
             text="Fit to Selection", icon='FULLSCREEN_ENTER')
         row_margin = col.row(align=True)
         row_margin.prop(scene, properties.PROP_FIT_MARGIN)
-        _plane_obj: bpy.types.Object | None = bpy.data.objects.get(
-            "QuadGrab Reference Plane")
-        if _plane_obj is not None:
+        if plane_obj is not None:
             row_plane.operator(
                 operators.OBJECT_OT_lks_quad_grab_fit_depth.bl_idname,
                 text="", icon='DRIVER_DISTANCE')
             _sel_icon: str = (
-                'RESTRICT_SELECT_ON' if _plane_obj.hide_select
+                'RESTRICT_SELECT_ON' if plane_obj.hide_select
                 else 'RESTRICT_SELECT_OFF'
             )
             row_plane.operator(
                 operators.OBJECT_OT_lks_quad_grab_toggle_plane_selectable.bl_idname,
                 text="", icon=_sel_icon)
 
-        # ── Output Settings (default open) ───────────────────────────────
+        # ── Collapsible sections ─────────────────────────────────────────
         col.separator(factor=0.5)
-        out_box, out_open = self._section(
-            col, scene, properties.PROP_OUTPUT_EXPANDED,
-            "Output Settings", 'OUTPUT')
-        if out_open:
-            out_box.prop(scene, properties.PROP_OUTPUT_DIR, text="")
-            row = out_box.row(align=True)
-            row.prop(scene, properties.PROP_OUTPUT_NAME, text="Name")
-            row.prop(scene, properties.PROP_USE_TIMESTAMP, toggle=True)
-            row = out_box.row(align=True)
-            row.prop(scene, properties.PROP_RENDER_SIZE)
-            row.prop(scene, properties.PROP_MAX_DEPTH)
-
-        # ── Grab Options (default open) ──────────────────────────────────
-        grab_box, grab_open = self._section(
-            col, scene, properties.PROP_GRAB_EXPANDED,
-            "Grab Options", 'CAMERA_DATA')
-        if grab_open:
-            row = grab_box.row(align=True)
-            row.prop(scene, properties.PROP_USE_DEPTH, text="Z", toggle=True)
-            row.prop(scene, properties.PROP_USE_DEPTH_EXR,
-                     text="Z EXR 0-1", toggle=True)
-            row.prop(scene, properties.PROP_USE_DEPTH_EXR_RAW,
-                     text="Z EXR Raw", toggle=True)
-            row.prop(scene, properties.PROP_USE_COMPOSITE,
-                     text="Composite", toggle=True)
-            row.prop(scene, properties.PROP_USE_PBR, text="PBR", toggle=True)
-            grab_box.prop(scene, properties.PROP_DEPTH_MIDPOINT, slider=True)
-
-        # ── Preview Options (default closed) ─────────────────────────────
-        prev_box, prev_open = self._section(
-            col, scene, properties.PROP_PREVIEW_EXPANDED,
-            "Preview Options", 'HIDE_OFF')
-        if prev_open:
-            row = prev_box.row(align=True)
-            row.prop(scene, properties.PROP_USE_PREVIEW_PLANE, toggle=True)
-            row.prop(scene, properties.PROP_DISPLACE_PLANE, toggle=True)
-            prev_box.prop(scene, properties.PROP_SHOW_OVERLAY,
-                          text="Show Capture Volume", icon='OVERLAY')
-
-        # ── Debug (default closed) ───────────────────────────────────────
-        dbg_box, dbg_open = self._section(
-            col, scene, properties.PROP_DEBUG_EXPANDED, "Debug", 'TOOL_SETTINGS')
-        if dbg_open:
-            row_ops = dbg_box.row(align=True)
-            row_ops.operator(
-                operators.OBJECT_OT_lks_quad_grab_setup.bl_idname,
-                text="Setup", icon='PREFERENCES')
-            row_ops.operator(
-                operators.OBJECT_OT_lks_quad_grab_restore.bl_idname,
-                text="Cleanup", icon='TRASH')
-            dbg_box.prop(scene, properties.PROP_USE_DEBUG, toggle=True)
+        for prop_name, default, label, icon, draw_body in self._SECTIONS:
+            # getattr, not scene.get(): from Blender 5.0 bpy.props values
+            # are no longer stored in the ID-property dict, so .get() would
+            # always return the default.
+            expanded: bool = getattr(scene, prop_name, default)
+            box = self._section(col, scene, prop_name, expanded, label, icon)
+            if expanded:
+                draw_body(self, box, scene)
+
+
+classesToRegister: tuple[type[bpy.types.Panel], ...] = (
+    VIEW3D_PT_lks_quad_grab,
+)
+
+# Handlers that can change bpy.data.filepath.
+_FILEPATH_HANDLERS = (bpy.app.handlers.load_post, bpy.app.handlers.save_post)
 
 
+# Classes are registered in one batch by register_quadgrab; register() and
+# unregister() only manage the file handlers.
 def register() -> None:
-    bpy.utils.register_class(VIEW3D_PT_lks_quad_grab)
+    for handlers in _FILEPATH_HANDLERS:
+        if _refresh_blend_saved not in handlers:
+            handlers.append(_refresh_blend_saved)
 
 
 def unregister() -> None:
-    bpy.utils.unregister_class(VIEW3D_PT_lks_quad_grab)
+    global _blend_saved
+    for handlers in _FILEPATH_HANDLERS:
+        if _refresh_blend_saved in handlers:
+            handlers.remove(_refresh_blend_saved)
+    _blend_saved = None
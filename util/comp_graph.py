@@ -4,16 +4,25 @@ from __future__ import annotations
 
 import bpy
 from .. import properties
-from .quadgrab_helpers import _QG_NODE_PREFIX, _init_file_output_dir
+from .quadgrab_helpers import (
+    _HAS_COMP_NODE_GROUP,
+    _HAS_MEDIA_TYPE,
+    _QG_NODE_PREFIX,
+    _USE_NEW_FILE_OUTPUT,
+    _comp_graph_builds,
+    _init_file_output_dir,
+)
 
 
-def build_comp_graph(timestamp: str) -> None:
-    """Build the full QuadGrab compositor node graph."""
-    scene = bpy.context.scene
-    # Blender 5.0+ removed scene.node_tree / scene.use_nodes in favour of
-    # scene.compositing_node_group / scene.render.use_compositing.
-    if hasattr(scene, 'compositing_node_group'):
-        # Blender 5.0+
+# Version-dependent helpers are defined once, in the variant matching the
+# running Blender, so build_comp_graph() itself carries no compat branches.
+if _HAS_COMP_NODE_GROUP:
+    def _ensure_compositor_tree(scene: bpy.types.Scene) -> bpy.types.CompositorNodeTree:
+        """Enable compositing and return the scene's compositor tree (5.0+).
+
+        5.0+ removed ``scene.node_tree`` / ``scene.use_nodes`` in favour of
+        ``scene.compositing_node_group`` / ``scene.render.use_compositing``.
+        """
         scene.render.use_compositing = True
         compgraph: bpy.types.CompositorNodeTree = scene.compositing_node_group
         if compgraph is None:
@@ -21,19 +30,206 @@ def build_comp_graph(timestamp: str) -> None:
             compgraph = bpy.data.node_groups.new(
                 'Compositing Nodetree', 'CompositorNodeTree')
             scene.compositing_node_group = compgraph
-    else:
-        # Blender 4.x
+        return compgraph
+else:
+    def _ensure_compositor_tree(scene: bpy.types.Scene) -> bpy.types.CompositorNodeTree:
+        """Enable compositing and return the scene's compositor tree (4.x)."""
         if not scene.use_nodes:
             scene.use_nodes = True
-        compgraph = scene.node_tree
+        compgraph: bpy.types.CompositorNodeTree = scene.node_tree
         if compgraph is None:
             raise RuntimeError(
                 "LKS QuadGrab: compositor node tree is None after enabling compositing.")
+        return compgraph
+
+
+if _USE_NEW_FILE_OUTPUT:
+    def _add_file_output_slots(
+        node: bpy.types.CompositorNodeOutputFile,
+        names: list[str],
+        socket_type: str = 'RGBA',
+    ) -> list[bpy.types.NodeSocket]:
+        """Create one ``file_output_items`` entry per name and return their inputs."""
+        items_new = node.file_output_items.new
+        for name in names:
+            items_new(socket_type, name=name)
+        inputs = node.inputs
+        return [inputs[name] for name in names]
+else:
+    def _add_file_output_slots(
+        node: bpy.types.CompositorNodeOutputFile,
+        names: list[str],
+        socket_type: str = 'RGBA',
+    ) -> list[bpy.types.NodeSocket]:
+        """Create one file slot per name and return their inputs, in order.
+
+        The default ``Image`` slot is reused for the first name (its input
+        socket keeps the name "Image"), so inputs are returned by position.
+        *socket_type* is unused: 4.x slots accept any socket type.
+        """
+        node.file_slots["Image"].path = names[0]
+        slots_new = node.file_slots.new
+        for name in names[1:]:
+            slots_new(name)
+        inputs = node.inputs
+        return [inputs[i] for i in range(len(names))]
+
+
+# Suffixes of every File Output slot QuadGrab can write; prefixed with the
+# grab timestamp once per build_comp_graph() call.
+_SLOT_SUFFIXES: tuple[str, ...] = (
+    "Composite", "Z", "Normal", "BaseColor", "BaseColor_srgb", "AO",
+    "Roughness", "Metallic", "Specular", "Alpha", "Depth_Raw", "Depth_Unitized",
+)
+
+# Math node type accepted by the compositor.  Probed on the first
+# _make_math() call (newer builds take ShaderNodeMath, older ones only
+# CompositorNodeMath) and reused for the rest of the session.
+_math_node_type: str | None = None
+
+# File Output node property holding the output directory.
+_FILE_OUTPUT_DIR_ATTR: str = "directory" if _USE_NEW_FILE_OUTPUT else "base_path"
+
+
+def _make_math(
+    compgraph: bpy.types.CompositorNodeTree,
+    name: str,
+    location: tuple[float, float],
+    operation: str,
+    const: float,
+) -> bpy.types.Node:
+    """Create a QG math node applying *operation* with *const* as input 1."""
+    global _math_node_type
+    nodes = compgraph.nodes
+    if _math_node_type is None:
+        try:
+            node = nodes.new(type="ShaderNodeMath")
+            _math_node_type = "ShaderNodeMath"
+        except RuntimeError:
+            node = nodes.new(type="CompositorNodeMath")
+            _math_node_type = "CompositorNodeMath"
+    else:
+        node = nodes.new(type=_math_node_type)
+    node.name = _QG_NODE_PREFIX + name
+    node.label = "QG " + name
+    node.location = location
+    node.operation = operation
+    node.inputs[1].default_value = const
+    return node
+
+
+def _make_file_output(
+    compgraph: bpy.types.CompositorNodeTree,
+    name: str,
+    location: tuple[float, float],
+    file_format: str,
+    color_depth: str,
+    output_dir: str,
+    view_transform: str | None = None,
+) -> bpy.types.CompositorNodeOutputFile:
+    """Create a QG File Output node writing *file_format* into *output_dir*.
+
+    When *view_transform* is given the node overrides the scene colour
+    management with it; otherwise the scene view transform applies.
+    """
+    node: bpy.types.CompositorNodeOutputFile = compgraph.nodes.new(
+        type="CompositorNodeOutputFile")
+    node.name = _QG_NODE_PREFIX + name
+    node.label = "QG " + name
+    node.location = location
+    _init_file_output_dir(node, output_dir)
+    settings: bpy.types.ImageFormatSettings = node.format
+    if _HAS_MEDIA_TYPE:
+        settings.media_type = 'IMAGE'
+    settings.file_format = file_format
+    settings.color_depth = color_depth
+    settings.compression = 100
+    if view_transform is not None:
+        settings.color_management = "OVERRIDE"
+        settings.view_settings.view_transform = view_transform
+    return node
+
+
+def _qg_graph_state(compgraph: bpy.types.CompositorNodeTree) -> tuple:
+    """Describe the QG nodes of *compgraph* as build_comp_graph() left them.
+
+    Covers every QG node name, the File Output directories, formats and
+    slots, the math node operations and constants, and every link touching
+    a QG node, so any edit to the QG graph changes the result.
+    """
+    node_state: list[tuple] = []
+    for n in compgraph.nodes:
+        if not n.name.startswith(_QG_NODE_PREFIX):
+            continue
+        if n.bl_idname == "CompositorNodeOutputFile":
+            settings: bpy.types.ImageFormatSettings = n.format
+            node_state.append((
+                n.name, getattr(n, _FILE_OUTPUT_DIR_ATTR),
+                settings.file_format, settings.color_depth,
+                settings.color_management,
+                settings.view_settings.view_transform,
+                tuple(sock.name for sock in n.inputs)))
+        elif n.type == 'MATH':
+            node_state.append(
+                (n.name, n.operation, n.inputs[1].default_value))
+        else:
+            node_state.append((n.name,))
+    link_state: list[tuple[str, str, str, str]] = sorted(
+        (link.from_node.name, link.from_socket.identifier,
+         link.to_node.name, link.to_socket.identifier)
+        for link in compgraph.links
+        if link.from_node.name.startswith(_QG_NODE_PREFIX)
+        or link.to_node.name.startswith(_QG_NODE_PREFIX))
+    return tuple(node_state), tuple(link_state)
+
+
+def build_comp_graph(timestamp: str) -> None:
+    """Build the full QuadGrab compositor node graph.
+
+    Returns early when the previous build in the same scene and tree used
+    the same timestamp and settings and its QG nodes, their settings and
+    links are all untouched, so re-running Setup (or Setup followed by
+    QuadGrab) doesn't tear down and rebuild the graph.  Any edit to the QG
+    graph makes the next call rebuild it.
+    """
+    scene = bpy.context.scene
+    # Read every addon setting once up front; the nested builders below
+    # close over these locals instead of re-walking bpy.context.scene.
+    output_dir: str = getattr(scene, properties.PROP_OUTPUT_DIR)
+    use_depth: bool = getattr(scene, properties.PROP_USE_DEPTH)
+    use_depth_exr: bool = getattr(scene, properties.PROP_USE_DEPTH_EXR)
+    use_depth_exr_raw: bool = getattr(scene, properties.PROP_USE_DEPTH_EXR_RAW)
+    use_composite: bool = getattr(scene, properties.PROP_USE_COMPOSITE)
+    use_pbr: bool = getattr(scene, properties.PROP_USE_PBR)
+    max_depth_val: float = getattr(scene, properties.PROP_MAX_DEPTH)
+    midpoint_val: float = getattr(scene, properties.PROP_DEPTH_MIDPOINT, 0.0)
+    # Timestamped slot names, built once and shared by every output node.
+    slot: dict[str, str] = {
+        suffix: timestamp + suffix for suffix in _SLOT_SUFFIXES}
+    compgraph: bpy.types.CompositorNodeTree = _ensure_compositor_tree(scene)
+    nodes = compgraph.nodes
+
+    build_key: tuple[str, str] = (scene.name, compgraph.name)
+    signature: tuple = (
+        timestamp, output_dir, use_depth, use_depth_exr, use_depth_exr_raw,
+        use_composite, use_pbr, max_depth_val, midpoint_val,
+    )
+    last_build = _comp_graph_builds.get(build_key)
+    if (last_build is not None and last_build[0] == signature
+            and last_build[1] == _qg_graph_state(compgraph)):
+        return
+
+    # Links are queued as (to_socket, from_socket) and created in one pass
+    # once every node exists; see the end of this function.
+    pending_links: list[tuple[bpy.types.NodeSocket, bpy.types.NodeSocket]] = []
 
     # Remove only previously-created QG nodes (preserve user nodes).
-    for compnode in list(compgraph.nodes):
-        if compnode.name.startswith(_QG_NODE_PREFIX):
-            compgraph.nodes.remove(compnode)
+    # Collect them in one pass first so the removals don't mutate the
+    # collection being iterated.
+    stale_nodes: list[bpy.types.Node] = [
+        n for n in nodes if n.name.startswith(_QG_NODE_PREFIX)]
+    for compnode in stale_nodes:
+        nodes.remove(compnode)
 
     # CompositorNodeComposite was removed in Blender 5.1.  It only
     # drives the built-in render result preview; all actual file output
@@ -52,227 +248,144 @@ def build_comp_graph(timestamp: str) -> None:
     n_img.name = _QG_NODE_PREFIX + "RenderLayers"
     n_img.label = "QG Render Layers"
     n_img.location = [-1000, 0]
+    # Resolve the always-present render outputs once; every builder below
+    # links from these instead of indexing n_img.outputs by name again.
+    img_image_out: bpy.types.NodeSocket = n_img.outputs["Image"]
+    img_alpha_out: bpy.types.NodeSocket = n_img.outputs["Alpha"]
+    img_depth_out: bpy.types.NodeSocket = n_img.outputs["Depth"]
+
+    # The PBR AOV outputs only exist once the QG view-layer AOVs are set up,
+    # so resolve them (once, for both PNG nodes) only when PBR is requested.
+    if use_pbr:
+        img_outs = n_img.outputs
+        aov_normal_out: bpy.types.NodeSocket = img_outs["QG_AOV_Normal"]
+        aov_base_color_out: bpy.types.NodeSocket = img_outs["QG_AOV_BaseColor"]
+        aov_ao_out: bpy.types.NodeSocket = (
+            img_outs["AO"] if "AO" in img_outs
+            else img_outs["Ambient Occlusion"])
+        aov_roughness_out: bpy.types.NodeSocket = img_outs["QG_AOV_Roughness"]
+        aov_metallic_out: bpy.types.NodeSocket = img_outs["QG_AOV_Metallic"]
+        aov_specular_out: bpy.types.NodeSocket = img_outs["QG_AOV_specular"]
 
     if _has_composite:
-        compgraph.links.new(n_comp.inputs["Image"], n_img.outputs["Image"])
-        compgraph.links.new(n_comp.inputs["Alpha"], n_img.outputs["Alpha"])
+        pending_links.append((n_comp.inputs["Image"], img_image_out))
+        pending_links.append((n_comp.inputs["Alpha"], img_alpha_out))
 
-    def setup_zdepth_graph() -> None:
+    def setup_zdepth_graph() -> tuple[bpy.types.Node, bpy.types.Node]:
         """Create nodes ``zdepth_inverted`` and ``zdepth_unitized``.
 
         Uses MULTIPLY(−1) rather than INVERT (which does 1−x) so that the
         surface pixel (raw depth ≈ 0) maps to 0 and increasing depth maps to
         increasingly negative values.  The NORMALIZE node that follows re-maps
         the monotonic range to [0, 1] (unitized output).
+
+        Returns ``(n_invert_z, n_normalize_z)`` so later builders can link
+        to them directly instead of looking them up by name.
         """
-        try:
-            n_invert_z = compgraph.nodes.new(type="ShaderNodeMath")
-        except RuntimeError:
-            n_invert_z = compgraph.nodes.new(type="CompositorNodeMath")
-        n_invert_z.name = _QG_NODE_PREFIX + "zdepth_inverted"
-        n_invert_z.label = "QG zdepth_inverted"
-        n_invert_z.location = (-700, 0)
-        n_invert_z.operation = 'MULTIPLY'
-        n_invert_z.inputs[1].default_value = -1.0
-        compgraph.links.new(n_invert_z.inputs[0], n_img.outputs["Depth"])
+        n_invert_z = _make_math(
+            compgraph, "zdepth_inverted", (-700, 0), 'MULTIPLY', -1.0)
+        pending_links.append((n_invert_z.inputs[0], img_depth_out))
         n_normalize_z: bpy.types.CompositorNodeNormalize = compgraph.nodes.new(
             "CompositorNodeNormalize")
         n_normalize_z.name = _QG_NODE_PREFIX + "zdepth_unitized"
         n_normalize_z.label = "QG zdepth_unitized"
         n_normalize_z.location = (-500, 0)
-        compgraph.links.new(n_normalize_z.inputs[0], n_invert_z.outputs[0])
-    setup_zdepth_graph()
-
-    def setup_compoutput_png(timestamp: str) -> None:
-        """Set up PNG Linear and PNG SRGB File Output nodes."""
-        n_file_png: bpy.types.CompositorNodeOutputFile = compgraph.nodes.new(
-            type="CompositorNodeOutputFile")
-        n_file_png.name = _QG_NODE_PREFIX + "File Out PNG Linear"
-        n_file_png.label = "QG File Out PNG Linear"
-
-        n_file_png.location = [0, -150]
-        output_dir: str = getattr(
-            bpy.context.scene, properties.PROP_OUTPUT_DIR)
-        _init_file_output_dir(n_file_png, output_dir)
-        # node settings
-        png_settings: bpy.types.ImageFormatSettings = n_file_png.format
-        if hasattr(png_settings, 'media_type'):
-            png_settings.media_type = 'IMAGE'
-        png_settings.file_format = "PNG"
-        png_settings.color_depth = "16"
-        png_settings.compression = 100
-        png_settings.color_management = "OVERRIDE"
-        png_settings.view_settings.view_transform = 'Raw'
-
-        # Create file output slots (5.0+: file_output_items, 4.x: file_slots)
-        slot_names: list[str] = [
-            timestamp + "Composite", timestamp + "Z", timestamp + "Normal",
-            timestamp + "BaseColor", timestamp + "AO", timestamp + "Roughness",
-            timestamp + "Metallic", timestamp + "Specular", timestamp + "Alpha",
-        ]
-        if hasattr(n_file_png, 'file_output_items'):
-            for sname in slot_names:
-                n_file_png.file_output_items.new('RGBA', name=sname)
-        else:
-            n_file_png.file_slots["Image"].path = slot_names[0]
-            for sname in slot_names[1:]:
-                n_file_png.file_slots.new(sname)
-
-        # Connect PNG (Linear) Outputs
-        if getattr(bpy.context.scene, properties.PROP_USE_DEPTH):
-            compgraph.links.new(
-                n_file_png.inputs[timestamp + "Z"], compgraph.nodes[_QG_NODE_PREFIX + "zdepth_unitized"].outputs[0])
-        if getattr(bpy.context.scene, properties.PROP_USE_PBR):
-            compgraph.links.new(
-                n_file_png.inputs[timestamp + "Normal"], n_img.outputs["QG_AOV_Normal"])
-            compgraph.links.new(
-                n_file_png.inputs[timestamp + "BaseColor"], n_img.outputs["QG_AOV_BaseColor"])
-            ao_output_name: str = "AO" if "AO" in n_img.outputs else "Ambient Occlusion"
-            compgraph.links.new(
-                n_file_png.inputs[timestamp + "AO"], n_img.outputs[ao_output_name])
-            compgraph.links.new(
-                n_file_png.inputs[timestamp + "Alpha"], n_img.outputs["Alpha"])
-            compgraph.links.new(
-                n_file_png.inputs[timestamp + "Roughness"], n_img.outputs["QG_AOV_Roughness"])
-            compgraph.links.new(
-                n_file_png.inputs[timestamp + "Metallic"], n_img.outputs["QG_AOV_Metallic"])
-            compgraph.links.new(
-                n_file_png.inputs[timestamp + "Specular"], n_img.outputs["QG_AOV_specular"])
-
-        # --- PNG SRGB ---
-        n_file_png_srgb: bpy.types.CompositorNodeOutputFile = compgraph.nodes.new(
-            type="CompositorNodeOutputFile")
-        n_file_png_srgb.name = _QG_NODE_PREFIX + "File Out PNG SRGB"
-        n_file_png_srgb.label = "QG File Out PNG SRGB"
-
-        png_srgb_settings: bpy.types.ImageFormatSettings = n_file_png_srgb.format
-        if hasattr(png_srgb_settings, 'media_type'):
-            png_srgb_settings.media_type = 'IMAGE'
-        png_srgb_settings.file_format = "PNG"
-        png_srgb_settings.color_depth = "16"
-        png_srgb_settings.compression = 100
-        png_srgb_settings.color_management = "OVERRIDE"
-        png_srgb_settings.view_settings.view_transform = 'Standard'
-
-        _init_file_output_dir(n_file_png_srgb, getattr(
-            bpy.context.scene, properties.PROP_OUTPUT_DIR))
-        n_file_png_srgb.location = [0, -250]
-
-        # Create file output slots (5.0+: file_output_items, 4.x: file_slots)
-        if hasattr(n_file_png_srgb, 'file_output_items'):
-            n_file_png_srgb.file_output_items.new(
-                'RGBA', name=timestamp + "Composite")
-            n_file_png_srgb.file_output_items.new(
-                'RGBA', name=timestamp + "BaseColor_srgb")
-        else:
-            n_file_png_srgb.file_slots["Image"].path = timestamp + "Composite"
-            n_file_png_srgb.file_slots.new(timestamp + "BaseColor_srgb")
+        pending_links.append((n_normalize_z.inputs[0], n_invert_z.outputs[0]))
+        return n_invert_z, n_normalize_z
+    # Every depth output reads from this chain; skip it when none is enabled.
+    if use_depth or use_depth_exr or use_depth_exr_raw:
+        n_invert_z, n_normalize_z = setup_zdepth_graph()
+
+    def setup_compoutput_png() -> None:
+        """Set up PNG Linear and PNG SRGB File Output nodes.
+
+        Only enabled outputs get a slot: unlinked File Output inputs write
+        nothing, so creating them just bloated the graph.
+        """
+        # (slot name, source socket) for every enabled linear PNG output.
+        linear_sources: list[tuple[str, bpy.types.NodeSocket]] = []
+        if use_depth:
+            linear_sources.append((slot["Z"], n_normalize_z.outputs[0]))
+        if use_pbr:
+            linear_sources += [
+                (slot["Normal"], aov_normal_out),
+                (slot["BaseColor"], aov_base_color_out),
+                (slot["AO"], aov_ao_out),
+                (slot["Roughness"], aov_roughness_out),
+                (slot["Metallic"], aov_metallic_out),
+                (slot["Specular"], aov_specular_out),
+                (slot["Alpha"], img_alpha_out),
+            ]
 
-        if getattr(bpy.context.scene, properties.PROP_USE_PBR):
-            compgraph.links.new(
-                n_file_png_srgb.inputs[timestamp + "BaseColor_srgb"], n_img.outputs["QG_AOV_BaseColor"])
+        if linear_sources:
+            n_file_png = _make_file_output(
+                compgraph, "File Out PNG Linear", (0, -150),
+                "PNG", "16", output_dir, view_transform='Raw')
 
-    setup_compoutput_png(timestamp=timestamp)
+            # Create one slot per enabled output and link it in the same pass.
+            slot_inputs = _add_file_output_slots(
+                n_file_png, [name for name, _source in linear_sources])
+            for slot_input, (_name, source) in zip(slot_inputs, linear_sources):
+                pending_links.append((slot_input, source))
+
+        # --- PNG SRGB (only carries the sRGB base colour) ---
+        if use_pbr:
+            n_file_png_srgb = _make_file_output(
+                compgraph, "File Out PNG SRGB", (0, -250),
+                "PNG", "16", output_dir, view_transform='Standard')
+
+            (srgb_input,) = _add_file_output_slots(
+                n_file_png_srgb, [slot["BaseColor_srgb"]])
+            pending_links.append((srgb_input, aov_base_color_out))
+
+    setup_compoutput_png()
 
     def setup_compoutput_png_tonemapped() -> None:
         """Set up tonemapped PNG File Output."""
-        n_file_png_tonemapped: bpy.types.CompositorNodeOutputFile = compgraph.nodes.new(
-            type="CompositorNodeOutputFile")
-        n_file_png_tonemapped.name = _QG_NODE_PREFIX + "File Out PNG Tonemapped"
-        n_file_png_tonemapped.label = "QG File Out PNG Tonemapped"
-        n_file_png_tonemapped.location = [0, -400]
-        _init_file_output_dir(n_file_png_tonemapped, getattr(
-            bpy.context.scene, properties.PROP_OUTPUT_DIR))
-        png_tonemapped_settings: bpy.types.ImageFormatSettings = n_file_png_tonemapped.format
-        if hasattr(png_tonemapped_settings, 'media_type'):
-            png_tonemapped_settings.media_type = 'IMAGE'
-        png_tonemapped_settings.file_format = "PNG"
-        png_tonemapped_settings.color_depth = "16"
-        png_tonemapped_settings.compression = 100
-        # Create file output slot (5.0+: file_output_items, 4.x: file_slots)
-        comp_input_name: str = timestamp + "Composite"
-        if hasattr(n_file_png_tonemapped, 'file_output_items'):
-            n_file_png_tonemapped.file_output_items.new(
-                'RGBA', name=comp_input_name)
-        else:
-            n_file_png_tonemapped.file_slots["Image"].path = comp_input_name
-            comp_input_name = "Image"  # 4.x: input socket keeps original name
-        if getattr(bpy.context.scene, properties.PROP_USE_COMPOSITE):
-            compgraph.links.new(
-                n_file_png_tonemapped.inputs[comp_input_name], n_img.outputs["Image"])
-    setup_compoutput_png_tonemapped()
+        # No view-transform override: this output uses the scene's tonemapping.
+        n_file_png_tonemapped = _make_file_output(
+            compgraph, "File Out PNG Tonemapped", (0, -400),
+            "PNG", "16", output_dir)
+        (comp_input,) = _add_file_output_slots(
+            n_file_png_tonemapped, [slot["Composite"]])
+        pending_links.append((comp_input, img_image_out))
+    if use_composite:
+        setup_compoutput_png_tonemapped()
 
     def setup_compoutput_exr() -> None:
-        """Set up EXR File Output."""
-        max_depth_val: float = getattr(
-            bpy.context.scene, properties.PROP_MAX_DEPTH)
-        midpoint_val: float = getattr(
-            bpy.context.scene, properties.PROP_DEPTH_MIDPOINT, 0.0)
+        """Set up EXR File Output with a slot per requested depth output."""
+        # (slot name, source socket) for each enabled EXR output.
+        exr_sources: list[tuple[str, bpy.types.NodeSocket]] = []
+        if use_depth_exr_raw:
+            # The height remap only feeds Depth_Raw, so it is only built here.
+            # MAXIMUM: floor at −max_depth so out-of-range / sky pixels clip cleanly.
+            n_max = _make_math(
+                compgraph, "EXR Height Max", (-500, -200), 'MAXIMUM', -max_depth_val)
+            pending_links.append((n_max.inputs[0], n_invert_z.outputs[0]))
+
+            # Shift zero point: ADD(midpoint × max_depth).
+            # Default midpoint=0 → shift=0 → range [−max_depth, 0], surface=0.
+            # midpoint=0.5 → shift=max_depth/2 → range [−max_depth/2, +max_depth/2],
+            # midplane=0, geometry in front is positive, behind is negative.
+            n_shift = _make_math(
+                compgraph, "EXR Height Shift", (-280, -200), 'ADD',
+                midpoint_val * max_depth_val)
+            pending_links.append((n_shift.inputs[0], n_max.outputs[0]))
 
-        # MAXIMUM: floor at −max_depth so out-of-range / sky pixels clip cleanly.
-        try:
-            n_max = compgraph.nodes.new(type="ShaderNodeMath")
-        except RuntimeError:
-            n_max = compgraph.nodes.new(type="CompositorNodeMath")
-        n_max.location = (-500, -200)
-        n_max.label = "QG EXR Height Max"
-        n_max.name = _QG_NODE_PREFIX + "EXR Height Max"
-        n_max.operation = 'MAXIMUM'
-        n_max.inputs[1].default_value = -max_depth_val
-        compgraph.links.new(
-            n_max.inputs[0], compgraph.nodes[_QG_NODE_PREFIX + "zdepth_inverted"].outputs[0])
-
-        # Shift zero point: ADD(midpoint × max_depth).
-        # Default midpoint=0 → shift=0 → range [−max_depth, 0], surface=0.
-        # midpoint=0.5 → shift=max_depth/2 → range [−max_depth/2, +max_depth/2],
-        # midplane=0, geometry in front is positive, behind is negative.
-        try:
-            n_shift = compgraph.nodes.new(type="ShaderNodeMath")
-        except RuntimeError:
-            n_shift = compgraph.nodes.new(type="CompositorNodeMath")
-        n_shift.location = (-280, -200)
-        n_shift.label = "QG EXR Height Shift"
-        n_shift.name = _QG_NODE_PREFIX + "EXR Height Shift"
-        n_shift.operation = 'ADD'
-        n_shift.inputs[1].default_value = midpoint_val * max_depth_val
-        compgraph.links.new(n_shift.inputs[0], n_max.outputs[0])
-
-        n_file_exr: bpy.types.CompositorNodeOutputFile = compgraph.nodes.new(
-            type="CompositorNodeOutputFile")
-        n_file_exr.name = _QG_NODE_PREFIX + "File Out EXR"
-        n_file_exr.label = "QG File Out EXR"
-        n_file_exr.location = [0, -600]
-        _init_file_output_dir(n_file_exr, getattr(
-            bpy.context.scene, properties.PROP_OUTPUT_DIR))
-        exr_settings: bpy.types.ImageFormatSettings = n_file_exr.format
-        if hasattr(exr_settings, 'media_type'):
-            exr_settings.media_type = 'IMAGE'
-        exr_settings.file_format = "OPEN_EXR"
-        exr_settings.color_depth = "32"
-        exr_settings.compression = 100
-        # Create file output slots and track input names for linking
-        depth_raw_name: str = timestamp + "Depth_Raw"
-        depth_unit_name: str = timestamp + "Depth_Unitized"
-        if hasattr(n_file_exr, 'file_output_items'):
-            n_file_exr.file_output_items.new('FLOAT', name=depth_raw_name)
-            n_file_exr.file_output_items.new('FLOAT', name=depth_unit_name)
-            depth_raw_input: str = depth_raw_name
-            depth_unit_input: str = depth_unit_name
-        else:
-            n_file_exr.file_slots.new(name="Depth_Unitized")
-            n_file_exr.file_slots["Image"].path = depth_raw_name
-            n_file_exr.file_slots[1].path = depth_unit_name
-            depth_raw_input = "Image"
-            depth_unit_input = "Depth_Unitized"
-        if getattr(bpy.context.scene, properties.PROP_USE_DEPTH_EXR_RAW):
             # Depth_Raw: signed world-space values, zero at surface + midpoint shift.
-            compgraph.links.new(
-                n_file_exr.inputs[depth_raw_input], n_shift.outputs[0])
-        if getattr(bpy.context.scene, properties.PROP_USE_DEPTH_EXR):
+            exr_sources.append((slot["Depth_Raw"], n_shift.outputs[0]))
+        if use_depth_exr:
             # Depth_Unitized: 0-1 range from the Normalize node.
-            compgraph.links.new(
-                n_file_exr.inputs[depth_unit_input], compgraph.nodes[_QG_NODE_PREFIX + 'zdepth_unitized'].outputs[0])
-    setup_compoutput_exr()
+            exr_sources.append((slot["Depth_Unitized"], n_normalize_z.outputs[0]))
+
+        n_file_exr = _make_file_output(
+            compgraph, "File Out EXR", (0, -600), "OPEN_EXR", "32", output_dir)
+        slot_inputs = _add_file_output_slots(
+            n_file_exr, [name for name, _source in exr_sources], 'FLOAT')
+        for slot_input, (_name, source) in zip(slot_inputs, exr_sources):
+            pending_links.append((slot_input, source))
+    if use_depth_exr or use_depth_exr_raw:
+        setup_compoutput_exr()
 
     # --- Viewer node so the compositor backdrop isn't blank ---
     try:
@@ -280,9 +393,14 @@ def build_comp_graph(timestamp: str) -> None:
         n_viewer.name = _QG_NODE_PREFIX + "Viewer"
         n_viewer.label = "QG Viewer"
         n_viewer.location = (300, 200)
-        compgraph.links.new(n_viewer.inputs["Image"], n_img.outputs["Image"])
+        pending_links.append((n_viewer.inputs["Image"], img_image_out))
         if "Alpha" in n_viewer.inputs:
-            compgraph.links.new(
-                n_viewer.inputs["Alpha"], n_img.outputs["Alpha"])
+            pending_links.append((n_viewer.inputs["Alpha"], img_alpha_out))
     except RuntimeError:
         pass  # Viewer node may be removed in a future Blender version
+
+    links_new = compgraph.links.new
+    for to_socket, from_socket in pending_links:
+        links_new(to_socket, from_socket)
+
+    _comp_graph_builds[build_key] = (signature, _qg_graph_state(compgraph))
@@ -4,187 +4,289 @@ from __future__ import annotations
 
 import bpy
 
+from .quadgrab_helpers import (
+    _QG_AOV_PREFIX,
+    _aov_signatures,
+    _link_sources,
+    _material_surface_node,
+)
 
-def setup_pbr_aovs_mats() -> tuple[int, int]:
-    """Hook AOV output nodes into every local Principled BSDF material.
+# Shader node type names used when patching materials.
+_T_AOV: str = "ShaderNodeOutputAOV"
+_T_VT: str = "ShaderNodeVectorTransform"
+_T_VM: str = "ShaderNodeVectorMath"
+
+# The AOV output nodes every patched material carries.
+_QG_AOV_NODE_NAMES: tuple[str, ...] = (
+    "QG_AOV_BaseColor",
+    "QG_AOV_Normal",
+    "QG_AOV_specular",
+    "QG_AOV_Roughness",
+    "QG_AOV_Metallic",
+)
+
+# Node-editor location of each AOV node, parallel to _QG_AOV_NODE_NAMES.
+_AOV_LOCS: tuple[tuple[int, int], ...] = (
+    (2000, 0), (2000, -100), (2000, -200), (2000, -300), (2000, -400),
+)
+
+# Scale and offset that remap a camera-space normal from [-1, 1] to [0, 1]
+# (Z flipped so the map faces the camera).
+_NORMAL_MULT: tuple[float, float, float] = (0.5, 0.5, -0.5)
+_NORMAL_ADD: tuple[float, float, float] = (0.5, 0.5, 0.5)
+
+# Shader inputs the AOVs read from, each with its fallback socket name.
+_AOV_SOURCE_INPUTS: tuple[tuple[str, str | None], ...] = (
+    ("Base Color", "BC"),
+    ("Normal", "NM"),
+    ("Specular IOR Level", "Specular"),
+    ("Roughness", None),
+    ("Metallic", None),
+)
+
+# AOV node input each source feeds, parallel to _AOV_SOURCE_INPUTS: the
+# colour AOVs take input 0, the value AOVs input 1.
+_AOV_TARGET_INPUTS: tuple[int, ...] = (0, 0, 1, 1, 1)
+
+# Position of the normal AOV in the tables above.  It is fed through the
+# normal chain rather than straight from its shader input.
+_NORMAL_AOV_INDEX: int = _QG_AOV_NODE_NAMES.index("QG_AOV_Normal")
+
+# Names of the normal-chain nodes, shared by the builder and the check.
+_N_NORMAL_TRANSFORM: str = "QG_AOV_NormalTransform"
+_N_NORMAL_MULT: str = "QG_AOV_NormalMult"
+_N_NORMAL_ADD: str = "QG_AOV_NormalAdd"
+_N_NORMAL_GEOMETRY: str = "QG_AOV_NormalGeometry"
+
+
+def _shader_input(
+    n_shader: bpy.types.Node,
+    name: str,
+    fallback: str | None,
+) -> bpy.types.NodeSocket | None:
+    """Return the shader input *name*, or *fallback* when that is missing."""
+    sock = n_shader.inputs.get(name)
+    if sock is None and fallback is not None:
+        sock = n_shader.inputs.get(fallback)
+    return sock
 
-    Returns ``(updated, skipped_linked)`` counts so callers can report
-    to the user how many linked materials were skipped.
+
+def _linked_from(
+    link_sources: dict[int, bpy.types.NodeSocket],
+    to_socket: bpy.types.NodeSocket,
+    from_socket: bpy.types.NodeSocket,
+) -> bool:
+    """Return True if *to_socket* is fed by *from_socket*."""
+    source = link_sources.get(to_socket.as_pointer())
+    return source is not None and source.as_pointer() == from_socket.as_pointer()
+
+
+def _aov_wiring_intact(
+    nt: bpy.types.NodeTree,
+    n_shader: bpy.types.Node,
+    link_sources: dict[int, bpy.types.NodeSocket],
+) -> bool:
+    """Return True if the material's QG AOV nodes are all wired as Setup built them.
+
+    Checks the AOV output nodes, the normal chain and every link into them,
+    so a deleted node or link makes the next Setup rebuild the material.
     """
-    updated: int = 0
-    skipped_linked: int = 0
-    for mat in bpy.data.materials:
-        mat: bpy.types.Material = mat
-
-        # Linked materials have read-only node trees — skip them.
-        if mat.library is not None:
-            skipped_linked += 1
-            print(f"QuadGrab: skipping linked material '{mat.name}'")
+    nodes = nt.nodes
+    aov_nodes: list[bpy.types.Node | None] = [
+        nodes.get(name) for name in _QG_AOV_NODE_NAMES]
+    if None in aov_nodes:
+        return False
+
+    for i, ((name, fallback), n_aov, index) in enumerate(zip(
+            _AOV_SOURCE_INPUTS, aov_nodes, _AOV_TARGET_INPUTS)):
+        if i == _NORMAL_AOV_INDEX:
+            continue  # fed through the normal chain, checked below
+        sock = _shader_input(n_shader, name, fallback)
+        if sock is None:
             continue
+        aov_input = n_aov.inputs[index]
+        if sock.is_linked:
+            if not _linked_from(
+                    link_sources, aov_input, link_sources[sock.as_pointer()]):
+                return False
+        elif aov_input.is_linked:
+            return False
+
+    normal_input = _shader_input(
+        n_shader, *_AOV_SOURCE_INPUTS[_NORMAL_AOV_INDEX])
+    if normal_input is None:
+        return True
+    n_transform = nodes.get(_N_NORMAL_TRANSFORM)
+    n_mult = nodes.get(_N_NORMAL_MULT)
+    n_add = nodes.get(_N_NORMAL_ADD)
+    if n_transform is None or n_mult is None or n_add is None:
+        return False
+    if normal_input.is_linked:
+        chain_source = link_sources[normal_input.as_pointer()]
+    else:
+        n_geometry = nodes.get(_N_NORMAL_GEOMETRY)
+        if n_geometry is None:
+            return False
+        chain_source = n_geometry.outputs["Normal"]
+    return (
+        _linked_from(link_sources, n_transform.inputs[0], chain_source)
+        and _linked_from(link_sources, n_mult.inputs[0], n_transform.outputs[0])
+        and _linked_from(link_sources, n_add.inputs[0], n_mult.outputs[0])
+        and _linked_from(
+            link_sources,
+            aov_nodes[_NORMAL_AOV_INDEX].inputs[
+                _AOV_TARGET_INPUTS[_NORMAL_AOV_INDEX]],
+            n_add.outputs[0]))
+
+
+def _aov_signature(
+    n_shader: bpy.types.Node,
+    link_sources: dict[int, bpy.types.NodeSocket],
+) -> tuple:
+    """Describe what the QG AOVs of a material would be wired to.
+
+    Covers the shader node plus, for each AOV source input, either the
+    linked upstream socket or the unlinked default value.
+    """
+    sig: list = [n_shader.name]
+    for name, fallback in _AOV_SOURCE_INPUTS:
+        sock = _shader_input(n_shader, name, fallback)
+        if sock is None:
+            sig.append(None)
+        elif sock.is_linked:
+            source = link_sources[sock.as_pointer()]
+            sig.append((source.node.name, source.identifier))
+        else:
+            value = getattr(sock, 'default_value', None)
+            sig.append(tuple(value) if hasattr(value, '__len__') else value)
+    return tuple(sig)
 
-        nt: bpy.types.NodeTree = mat.node_tree
+
+def setup_pbr_aovs_mats() -> tuple[list[str], int, int]:
+    """Hook AOV output nodes into every local Principled BSDF material.
+
+    Materials whose QG AOV nodes and links are all intact and whose shader
+    wiring is unchanged since they were last patched are left alone.
+
+    Returns ``(patched, skipped_linked, skipped_unchanged)``.  ``patched``
+    names every material that carries QG AOV nodes afterwards (rebuilt or
+    unchanged), so restore can visit just those; the counts let callers
+    report how many linked materials were skipped.
+    """
+    patched: list[str] = []
+    skipped_unchanged: int = 0
+    # Linked materials have read-only node trees — skip them.
+    materials = bpy.data.materials
+    local_mats: list[bpy.types.Material] = [
+        m for m in materials if m.library is None]
+    skipped_linked: int = len(materials) - len(local_mats)
+    if skipped_linked:
+        print(f"QuadGrab: skipping {skipped_linked} linked material(s)")
+
+    for mat in local_mats:
+        nt: bpy.types.NodeTree | None = mat.node_tree
         n_shader: bpy.types.ShaderNodeBsdfPrincipled | None = None
-        try:
-            n_shader = nt.nodes["Material Output"].inputs[0].links[0].from_node
-        except Exception:
+        if nt is not None:
+            link_sources = _link_sources(nt)
+            n_shader = _material_surface_node(nt, link_sources)
+        if n_shader is None:
             print("Couldn't add PBR AOVs to " +
                   mat.name + ", not Principled BSDF")
             continue
 
-        # Clear old aovs first
-        for n in nt.nodes:
-            if n.name.count("QG_AOV") != 0:
-                nt.nodes.remove(n)
-
-        # Setup AOV Nodes
-        n_aov_bc: bpy.types.ShaderNodeOutputAOV = nt.nodes.new(
-            type="ShaderNodeOutputAOV")
-        n_aov_bc.name = "QG_AOV_BaseColor"
-        n_aov_bc.aov_name = "QG_AOV_BaseColor"
-        n_aov_bc.label = "QG_AOV_BaseColor"
-        n_aov_bc.location = (2000, 0)
-
-        n_aov_normal: bpy.types.ShaderNodeOutputAOV = nt.nodes.new(
-            type="ShaderNodeOutputAOV")
-        n_aov_normal.name = "QG_AOV_Normal"
-        n_aov_normal.aov_name = "QG_AOV_Normal"
-        n_aov_normal.label = "QG_AOV_Normal"
-        n_aov_normal.location = (2000, -100)
-
-        n_aov_specular: bpy.types.ShaderNodeOutputAOV = nt.nodes.new(
-            type="ShaderNodeOutputAOV")
-        n_aov_specular.name = "QG_AOV_specular"
-        n_aov_specular.aov_name = "QG_AOV_specular"
-        n_aov_specular.label = "QG_AOV_specular"
-        n_aov_specular.location = (2000, -200)
-
-        n_aov_roughness: bpy.types.ShaderNodeOutputAOV = nt.nodes.new(
-            type="ShaderNodeOutputAOV")
-        n_aov_roughness.name = "QG_AOV_Roughness"
-        n_aov_roughness.aov_name = "QG_AOV_Roughness"
-        n_aov_roughness.label = "QG_AOV_Roughness"
-        n_aov_roughness.location = (2000, -300)
-
-        n_aov_metallic: bpy.types.ShaderNodeOutputAOV = nt.nodes.new(
-            type="ShaderNodeOutputAOV")
-        n_aov_metallic.name = "QG_AOV_Metallic"
-        n_aov_metallic.aov_name = "QG_AOV_Metallic"
-        n_aov_metallic.label = "QG_AOV_Metallic"
-        n_aov_metallic.location = (2000, -400)
-
-        bc_input = n_shader.inputs.get(
-            "Base Color") or n_shader.inputs.get("BC")
-        normal_input = n_shader.inputs.get(
-            "Normal") or n_shader.inputs.get("NM")
-        specular_input = n_shader.inputs.get(
-            "Specular IOR Level") or n_shader.inputs.get("Specular")
-        roughness_input = n_shader.inputs.get("Roughness")
-        metallic_input = n_shader.inputs.get("Metallic")
-
-        if bc_input is not None:
-            try:
-                nt.links.new(n_aov_bc.inputs[0], bc_input.links[0].from_socket)
-            except Exception:
-                n_aov_bc.inputs[0].default_value = bc_input.default_value
+        sig: tuple = _aov_signature(n_shader, link_sources)
+        if (_aov_signatures.get(mat.name) == sig
+                and _aov_wiring_intact(nt, n_shader, link_sources)):
+            skipped_unchanged += 1
+            patched.append(mat.name)
+            continue
+
+        # Clear old aovs first.  Collect them before removing so the node
+        # collection isn't mutated while it is being iterated.
+        stale_aovs: list[bpy.types.Node] = [
+            n for n in nt.nodes if n.name.startswith(_QG_AOV_PREFIX)]
+        nodes_remove = nt.nodes.remove
+        for n in stale_aovs:
+            nodes_remove(n)
+        nodes_new = nt.nodes.new
+        links_new = nt.links.new
+
+        # Setup AOV Nodes, stacked in _QG_AOV_NODE_NAMES order.
+        aov_nodes: list[bpy.types.ShaderNodeOutputAOV] = []
+        for aov_name, location in zip(_QG_AOV_NODE_NAMES, _AOV_LOCS):
+            n_aov: bpy.types.ShaderNodeOutputAOV = nodes_new(type=_T_AOV)
+            n_aov.name = aov_name
+            n_aov.aov_name = aov_name
+            n_aov.label = aov_name
+            n_aov.location = location
+            aov_nodes.append(n_aov)
+
+        # Feed each AOV from the shader input's upstream socket, or copy
+        # the input's value when nothing is plugged into it.  is_linked plus
+        # the link map avoids a links[0] walk (and exception) per input.
+        # Driven by the same tables as _aov_wiring_intact() so the two agree.
+        for i, ((name, fallback), n_aov, index) in enumerate(zip(
+                _AOV_SOURCE_INPUTS, aov_nodes, _AOV_TARGET_INPUTS)):
+            if i == _NORMAL_AOV_INDEX:
+                continue  # fed through the normal chain below
+            shader_input = _shader_input(n_shader, name, fallback)
+            if shader_input is None:
+                continue
+            aov_input = n_aov.inputs[index]
+            if shader_input.is_linked:
+                links_new(aov_input, link_sources[shader_input.as_pointer()])
+            else:
+                aov_input.default_value = shader_input.default_value
 
+        normal_input = _shader_input(
+            n_shader, *_AOV_SOURCE_INPUTS[_NORMAL_AOV_INDEX])
         if normal_input is not None:
-            def _setup_mat_normal_aov() -> None:
-                nt.links.new(
-                    n_aov_normal.inputs[0], normal_input.links[0].from_socket)
-
-                n_normal_transform = nt.nodes.new(
-                    type="ShaderNodeVectorTransform")
-                n_normal_transform.name = "QG_AOV_NormalTransform"
-                n_normal_transform.label = "QG_AOV_NormalTransform"
+            n_aov_normal = aov_nodes[_NORMAL_AOV_INDEX]
+            normal_aov_input = n_aov_normal.inputs[
+                _AOV_TARGET_INPUTS[_NORMAL_AOV_INDEX]]
+
+            def _build_normal_chain(src_socket: bpy.types.NodeSocket) -> None:
+                """Remap *src_socket* to camera-space 0-1 and feed the AOV."""
+                n_normal_transform = nodes_new(type=_T_VT)
+                n_normal_transform.name = _N_NORMAL_TRANSFORM
+                n_normal_transform.label = _N_NORMAL_TRANSFORM
                 n_normal_transform.convert_from = "WORLD"
                 n_normal_transform.convert_to = "CAMERA"
                 n_normal_transform.location = (1000, -100)
-                nt.links.new(
-                    n_normal_transform.inputs[0], normal_input.links[0].from_socket)
+                links_new(n_normal_transform.inputs[0], src_socket)
 
-                n_normal_mult = nt.nodes.new(type="ShaderNodeVectorMath")
-                n_normal_mult.name = "QG_AOV_NormalMult"
-                n_normal_mult.label = "QG_AOV_NormalMult"
+                n_normal_mult = nodes_new(type=_T_VM)
+                n_normal_mult.name = _N_NORMAL_MULT
+                n_normal_mult.label = _N_NORMAL_MULT
                 n_normal_mult.location = (1200, -100)
                 n_normal_mult.operation = "MULTIPLY"
-                n_normal_mult.inputs[1].default_value = [0.5, 0.5, -0.5]
-                nt.links.new(
+                n_normal_mult.inputs[1].default_value = _NORMAL_MULT
+                links_new(
                     n_normal_mult.inputs[0], n_normal_transform.outputs[0])
 
-                n_normal_add = nt.nodes.new(type="ShaderNodeVectorMath")
-                n_normal_add.name = "QG_AOV_NormalAdd"
-                n_normal_add.label = "QG_AOV_NormalAdd"
+                n_normal_add = nodes_new(type=_T_VM)
+                n_normal_add.name = _N_NORMAL_ADD
+                n_normal_add.label = _N_NORMAL_ADD
                 n_normal_add.location = (1400, -100)
                 n_normal_add.operation = "ADD"
-                n_normal_add.inputs[1].default_value = [0.5, 0.5, 0.5]
-                nt.links.new(n_normal_add.inputs[0], n_normal_mult.outputs[0])
+                n_normal_add.inputs[1].default_value = _NORMAL_ADD
+                links_new(n_normal_add.inputs[0], n_normal_mult.outputs[0])
 
-                nt.links.new(
-                    input=n_aov_normal.inputs[0], output=n_normal_add.outputs[0], verify_limits=True)
+                links_new(
+                    input=normal_aov_input, output=n_normal_add.outputs[0], verify_limits=True)
 
-            def _setup_geometry_normal_aov() -> None:
+            if normal_input.is_linked:
+                # Use the material's own (e.g. normal-mapped) normal.
+                _build_normal_chain(link_sources[normal_input.as_pointer()])
+            else:
                 print("Setting up geo normal")
-                n_normal_geometry = nt.nodes.new(type="ShaderNodeNewGeometry")
-                n_normal_geometry.name = "QG_AOV_NormalGeometry"
-                n_normal_geometry.label = "QG_AOV_NormalGeometry"
+                n_normal_geometry = nodes_new(type="ShaderNodeNewGeometry")
+                n_normal_geometry.name = _N_NORMAL_GEOMETRY
+                n_normal_geometry.label = _N_NORMAL_GEOMETRY
                 n_normal_geometry.location = (800, -100)
+                _build_normal_chain(n_normal_geometry.outputs["Normal"])
 
-                n_normal_transform = nt.nodes.new(
-                    type="ShaderNodeVectorTransform")
-                n_normal_transform.name = "QG_AOV_NormalTransform"
-                n_normal_transform.label = "QG_AOV_NormalTransform"
-                n_normal_transform.convert_from = "WORLD"
-                n_normal_transform.convert_to = "CAMERA"
-                n_normal_transform.location = (1000, -100)
-                nt.links.new(
-                    n_normal_transform.inputs[0], n_normal_geometry.outputs["Normal"])
-
-                n_normal_mult = nt.nodes.new(type="ShaderNodeVectorMath")
-                n_normal_mult.name = "QG_AOV_NormalMult"
-                n_normal_mult.label = "QG_AOV_NormalMult"
-                n_normal_mult.location = (1200, -100)
-                n_normal_mult.operation = "MULTIPLY"
-                n_normal_mult.inputs[1].default_value = [0.5, 0.5, -0.5]
-                nt.links.new(
-                    n_normal_mult.inputs[0], n_normal_transform.outputs[0])
+        _aov_signatures[mat.name] = sig
+        patched.append(mat.name)
 
-                n_normal_add = nt.nodes.new(type="ShaderNodeVectorMath")
-                n_normal_add.name = "QG_AOV_NormalAdd"
-                n_normal_add.label = "QG_AOV_NormalAdd"
-                n_normal_add.location = (1400, -100)
-                n_normal_add.operation = "ADD"
-                n_normal_add.inputs[1].default_value = [0.5, 0.5, 0.5]
-                nt.links.new(n_normal_add.inputs[0], n_normal_mult.outputs[0])
-
-                nt.links.new(
-                    input=n_aov_normal.inputs[0], output=n_normal_add.outputs[0], verify_limits=True)
-
-            try:
-                _setup_mat_normal_aov()
-            except Exception:
-                _setup_geometry_normal_aov()
-
-        if specular_input is not None:
-            try:
-                nt.links.new(
-                    n_aov_specular.inputs[1], specular_input.links[0].from_socket)
-            except Exception:
-                n_aov_specular.inputs[1].default_value = specular_input.default_value
-
-        if roughness_input is not None:
-            try:
-                nt.links.new(
-                    n_aov_roughness.inputs[1], roughness_input.links[0].from_socket)
-            except Exception:
-                n_aov_roughness.inputs[1].default_value = roughness_input.default_value
-
-        if metallic_input is not None:
-            try:
-                nt.links.new(
-                    n_aov_metallic.inputs[1], metallic_input.links[0].from_socket)
-            except Exception:
-                n_aov_metallic.inputs[1].default_value = metallic_input.default_value
-
-        updated += 1
-
-    return updated, skipped_linked
+    return patched, skipped_linked, skipped_unchanged
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import os
+from collections.abc import Iterator
 
 import bpy
 
@@ -22,56 +23,100 @@ CLIP_START: float = 0.001
 # ``file_slots`` and DOES append a 4-digit frame number.
 _USE_NEW_FILE_OUTPUT: bool = bpy.app.version >= (5, 0, 0)
 
+# ImageFormatSettings gained ``media_type`` in the same 5.0 release.  Both
+# flags replace per-node ``hasattr`` probes in the graph builders.
+_HAS_MEDIA_TYPE: bool = bpy.app.version >= (5, 0, 0)
+
+# Blender 5.0+ replaced ``scene.node_tree`` with
+# ``scene.compositing_node_group``.
+_HAS_COMP_NODE_GROUP: bool = bpy.app.version >= (5, 0, 0)
+
 # Prefix applied to every compositor node created by QuadGrab so cleanup
 # can identify and remove them without touching user nodes.
 _QG_NODE_PREFIX: str = "QG_"
 
+# Prefix of the view-layer AOVs and the material nodes that feed them.
+_QG_AOV_PREFIX: str = "QG_AOV"
+
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
+# Specialised once at import: 5.0+ File Output nodes write ``<name>.<ext>``,
+# 4.x appends a zero-padded frame number.
+if _USE_NEW_FILE_OUTPUT:
+    def _rendered_filepath_abs(abs_dir: str, basename: str, ext: str, frame: int | None = None) -> str:
+        """Build the path to a rendered output file inside resolved *abs_dir*."""
+        return os.path.join(abs_dir, f"{basename}.{ext}")
+else:
+    def _rendered_filepath_abs(abs_dir: str, basename: str, ext: str, frame: int | None = None) -> str:
+        """Build the path to a rendered output file inside resolved *abs_dir*."""
+        if frame is None:
+            frame = bpy.context.scene.frame_current
+        return os.path.join(abs_dir, f"{basename}{frame:04d}.{ext}")
+
+
 def _rendered_filepath(output_dir: str, basename: str, ext: str, frame: int | None = None) -> str:
     """Build the absolute path to a rendered output file.
 
     Resolves Blender's ``//`` blend-relative prefix.  On 4.x the File Output
-    node appends a zero-padded frame number; on 5.0+ it does not.
+    node appends a zero-padded frame number; on 5.0+ it does not.  Callers
+    building several paths should resolve the directory once and use
+    ``_rendered_filepath_abs`` instead.
     """
-    abs_dir: str = bpy.path.abspath(output_dir)
-    if _USE_NEW_FILE_OUTPUT:
-        filename: str = f"{basename}.{ext}"
-    else:
-        if frame is None:
-            frame = bpy.context.scene.frame_current
-        filename = f"{basename}{frame:04d}.{ext}"
-    return os.path.join(abs_dir, filename)
+    return _rendered_filepath_abs(bpy.path.abspath(output_dir), basename, ext, frame)
 
 
-def _init_file_output_dir(node: bpy.types.CompositorNodeOutputFile, output_dir: str) -> None:
-    """Set the output directory on a File Output node (compat 4.x / 5.0+).
+if _USE_NEW_FILE_OUTPUT:
+    def _init_file_output_dir(node: bpy.types.CompositorNodeOutputFile, output_dir: str) -> None:
+        """Set the output directory on a 5.0+ File Output node.
 
-    On 5.0+ also clears the default ``file_name`` prefix that would otherwise
-    be prepended to every output filename.
-    """
-    if hasattr(node, 'directory'):
+        Also clears the default ``file_name`` prefix ("file_name") that would
+        otherwise be prepended to every output filename.
+        """
         node.directory = output_dir
-        # 5.0+ defaults file_name to "file_name" — clear it so output
-        # filenames match the item names exactly.
-        if hasattr(node, 'file_name'):
-            node.file_name = ""
-    else:
+        node.file_name = ""
+else:
+    def _init_file_output_dir(node: bpy.types.CompositorNodeOutputFile, output_dir: str) -> None:
+        """Set the output directory on a 4.x File Output node."""
         node.base_path = output_dir
 
 
-def _count_materials_missing_aovs() -> int:
-    """Count local Principled BSDF materials *on scene objects* that have no QG_AOV nodes.
+def _link_sources(nt: bpy.types.NodeTree) -> dict[int, bpy.types.NodeSocket]:
+    """Map every linked input socket of *nt* to the socket feeding it.
+
+    Keyed by ``to_socket.as_pointer()``.  Each ``socket.links`` access walks
+    the tree's whole link list, so callers that resolve several inputs of
+    one material build this map once and look sockets up in it instead.
+    The map is not kept across calls — node and socket references go stale
+    as soon as the tree is edited.
+    """
+    return {link.to_socket.as_pointer(): link.from_socket for link in nt.links}
+
+
+def _material_surface_node(
+    nt: bpy.types.NodeTree,
+    link_sources: dict[int, bpy.types.NodeSocket],
+) -> bpy.types.Node | None:
+    """Return the node plugged into the Material Output surface, or None."""
+    n_output: bpy.types.Node | None = nt.nodes.get("Material Output")
+    if n_output is None:
+        return None
+    source = link_sources.get(n_output.inputs[0].as_pointer())
+    return source.node if source is not None else None
+
+
+def _iter_materials_missing_aovs() -> Iterator[bpy.types.Material]:
+    """Yield local Principled BSDF materials *on scene objects* that have no QG_AOV nodes.
 
     Only scene objects are checked because Setup only processes materials on
     scene objects — checking all of bpy.data.materials would flag orphan or
     unused materials that Setup never touches.  Linked materials are skipped.
+    Lazy, so callers that only need to know whether any exist stop at the
+    first hit.
     """
     seen: set[str] = set()
-    count: int = 0
     for obj in bpy.context.scene.objects:
         for slot in obj.material_slots:
             mat = slot.material
@@ -80,17 +125,57 @@ def _count_materials_missing_aovs() -> int:
             seen.add(mat.name)
             if mat.library is not None:
                 continue  # linked — read-only node tree
-            if mat.node_tree is None:
-                continue
-            try:
-                node = mat.node_tree.nodes["Material Output"].inputs[0].links[0].from_node
-                if node.type != 'BSDF_PRINCIPLED':
-                    continue
-            except Exception:
+            nt = mat.node_tree
+            # Node names are unique, so a keyed lookup replaces the scan.
+            # Checked first: it is cheaper than resolving the surface node.
+            if nt is None or "QG_AOV_BaseColor" in nt.nodes:
                 continue
-            if not any(n.name == "QG_AOV_BaseColor" for n in mat.node_tree.nodes):
-                count += 1
-    return count
+            node = _material_surface_node(nt, _link_sources(nt))
+            if node is not None and node.type == 'BSDF_PRINCIPLED':
+                yield mat
+
+
+def _any_material_missing_aovs() -> bool:
+    """Return True as soon as one scene material is found without AOV nodes."""
+    return next(_iter_materials_missing_aovs(), None) is not None
+
+
+def _count_materials_missing_aovs() -> int:
+    """Count the scene materials that have no QG_AOV nodes."""
+    return sum(1 for _mat in _iter_materials_missing_aovs())
+
+
+# ---------------------------------------------------------------------------
+# Build memos
+# ---------------------------------------------------------------------------
+
+# Material name -> wiring signature at the time its AOVs were last built
+# (see pbr_aovs).  Kept in memory only so nothing extra is saved into the
+# user's .blend; material names repeat between files, so it is cleared on
+# every file load.
+_aov_signatures: dict[str, tuple] = {}
+
+# (scene name, compositor tree name) -> (inputs signature, QG graph state)
+# of the last graph build_comp_graph() produced there (see comp_graph).
+# Scene and tree names repeat between files too, so it is cleared likewise.
+_comp_graph_builds: dict[tuple[str, str], tuple[tuple, tuple]] = {}
+
+
+@bpy.app.handlers.persistent
+def _clear_build_memos(*_args: object) -> None:
+    _aov_signatures.clear()
+    _comp_graph_builds.clear()
+
+
+def register() -> None:
+    if _clear_build_memos not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(_clear_build_memos)
+
+
+def unregister() -> None:
+    if _clear_build_memos in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(_clear_build_memos)
+    _clear_build_memos()
 
 
 def get_scene_issues(context: bpy.types.Context) -> list[str]:
@@ -128,17 +213,20 @@ def get_scene_issues(context: bpy.types.Context) -> list[str]:
 
     # AOV check — only relevant when PBR output is requested
     if getattr(scene, properties.PROP_USE_PBR, False):
-        missing_aovs: int = _count_materials_missing_aovs()
-        if missing_aovs > 0:
+        # Only whether any are missing matters here, so stop at the first.
+        if _any_material_missing_aovs():
             issues.append(
-                f"{missing_aovs} material(s) missing AOV nodes — run Setup again"
+                "Material(s) missing AOV nodes — run Setup again"
             )
 
     return issues
 
 
-def _get_compositor_tree(scene: bpy.types.Scene) -> bpy.types.CompositorNodeTree | None:
-    """Return the scene's compositor node tree (compat 4.x / 5.0+)."""
-    if hasattr(scene, 'compositing_node_group'):
+if _HAS_COMP_NODE_GROUP:
+    def _get_compositor_tree(scene: bpy.types.Scene) -> bpy.types.CompositorNodeTree | None:
+        """Return the scene's compositor node tree (5.0+)."""
         return scene.compositing_node_group
-    return getattr(scene, 'node_tree', None)
+else:
+    def _get_compositor_tree(scene: bpy.types.Scene) -> bpy.types.CompositorNodeTree | None:
+        """Return the scene's compositor node tree (4.x)."""
+        return getattr(scene, 'node_tree', None)
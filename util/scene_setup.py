@@ -13,28 +13,124 @@ These functions are shared by:
 
 from __future__ import annotations
 
+import gc
+import json
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import NamedTuple
+
 import bpy
 
 from .. import properties
-from .comp_graph import build_comp_graph
-from .pbr_aovs import setup_pbr_aovs_mats
-from .quadgrab_helpers import _QG_NODE_PREFIX, _get_compositor_tree
-
-# AOV definitions used by both setup and view-layer initialisation.
-_QG_AOV_DEFS: tuple[tuple[str, str], ...] = (
-    ("QG_AOV_BaseColor", "COLOR"),
-    ("QG_AOV_Normal", "COLOR"),
-    ("QG_AOV_specular", "VALUE"),
-    ("QG_AOV_Roughness", "VALUE"),
-    ("QG_AOV_Metallic", "VALUE"),
+from .quadgrab_helpers import (
+    _HAS_COMP_NODE_GROUP,
+    _QG_AOV_PREFIX,
+    _QG_NODE_PREFIX,
+    _get_compositor_tree,
+)
+
+# Resolved once so the setup entry point skips the cross-module lookup.
+_PROP_USE_PBR_NAME: str = properties.PROP_USE_PBR
+
+# View-layer passes QuadGrab switches on.  Shared by setup, the snapshot and
+# restore so the three can't drift; each is also a _QGCache field name.
+_QG_VL_PASS_FLAGS: tuple[str, ...] = (
+    "use_pass_normal",
+    "use_pass_z",
+    "use_pass_diffuse_color",
+    "use_pass_glossy_color",
+    "use_pass_ambient_occlusion",
 )
 
+# AOV definitions (name -> type) used by both setup and restore.  Read-only
+# so the shared table can't be mutated; name lookups are a single hash.
+_QG_AOV_DEFS: Mapping[str, str] = MappingProxyType({
+    "QG_AOV_BaseColor": "COLOR",
+    "QG_AOV_Normal": "COLOR",
+    "QG_AOV_specular": "VALUE",
+    "QG_AOV_Roughness": "VALUE",
+    "QG_AOV_Metallic": "VALUE",
+})
+
+
+class _QGCache(NamedTuple):
+    """Pre-setup scene state that :func:`restore_quadgrab` puts back."""
+    render_engine: str
+    film_transparent: bool
+    use_pass_normal: bool
+    use_pass_z: bool
+    use_pass_diffuse_color: bool
+    use_pass_glossy_color: bool
+    use_pass_ambient_occlusion: bool
+    had_compositing: bool
+    had_comp_tree: bool
+    # Materials carrying QG AOV nodes; None means unknown, so restore scans
+    # every material instead.
+    qg_patched_materials: tuple[str, ...] | None = None
+
+
+def _set_if_changed(obj: bpy.types.bpy_struct, attr: str, value: object) -> None:
+    """Assign *value* to ``obj.attr`` only if it differs.
+
+    RNA writes tag the depsgraph even when the value is unchanged, so this
+    keeps a no-op restore from triggering updates and redraws.
+    """
+    if getattr(obj, attr) != value:
+        setattr(obj, attr, value)
+
+
+def _cache_to_json(cache: _QGCache) -> str:
+    """Serialise *cache* for ``PROP_CACHED_SETTINGS``."""
+    return json.dumps(cache._asdict())
+
+
+def _cache_from_json(text: str) -> _QGCache | None:
+    """Parse a cache persisted by the Setup operator.
+
+    Returns None for an empty string, or for a cache missing snapshot fields
+    (e.g. one written by an older version) — restore then only removes the
+    QG_ nodes and AOVs and leaves the render settings as they are.
+    """
+    if not text:
+        return None
+    data: dict[str, object] = json.loads(text)
+    try:
+        cache = _QGCache(
+            **{k: v for k, v in data.items() if k in _QGCache._fields})
+    except TypeError:
+        return None
+    if cache.qg_patched_materials is not None:
+        # JSON has no tuples; normalise the list back.
+        cache = cache._replace(
+            qg_patched_materials=tuple(cache.qg_patched_materials))
+    return cache
+
+
+def _merge_patched_materials(
+    scene: bpy.types.Scene,
+    patched: list[str],
+) -> tuple[str, ...] | None:
+    """Combine *patched* with the registry of the setup persisted on *scene*.
+
+    A repeated Setup overwrites ``PROP_CACHED_SETTINGS``, so names patched by
+    the earlier setup are carried over.  Returns None when that earlier setup
+    did not record its materials, so restore falls back to a full scan.
+    """
+    previous: _QGCache | None = _cache_from_json(
+        getattr(scene, properties.PROP_CACHED_SETTINGS, ""))
+    if previous is None:
+        return tuple(patched)
+    if previous.qg_patched_materials is None:
+        return None
+    # dict.fromkeys de-duplicates while keeping the earlier names first.
+    return tuple(dict.fromkeys(previous.qg_patched_materials + tuple(patched)))
+
 
 def apply_quadgrab_setup(
     scene: bpy.types.Scene,
     vl: bpy.types.ViewLayer,
     timestamp: str = "",
-) -> tuple[dict[str, object], int]:
+) -> tuple[_QGCache, int]:
     """Apply all QuadGrab scene changes and build the compositor graph.
 
     Returns ``(cache, skipped_linked)`` where:
@@ -47,51 +143,66 @@ def apply_quadgrab_setup(
     This function is intentionally side-effect-free with respect to the
     scene's ``PROP_CACHED_SETTINGS`` property — the caller decides whether
     to persist the cache (Setup operator) or keep it in memory (atomic QuadGrab).
+    It is only read, to carry over the materials an earlier Setup patched.
+    If a step raises, the partial changes are restored before re-raising.
     """
+    # Imported here rather than at module level: restore and the Cleanup
+    # operator never need the graph / material builders.
+    from .comp_graph import build_comp_graph
+    from .pbr_aovs import setup_pbr_aovs_mats
+
+    render: bpy.types.RenderSettings = scene.render
+
     # --- 1. Snapshot current state so restore_quadgrab can undo ---
-    if hasattr(scene, 'compositing_node_group'):
-        had_compositing: bool = scene.render.use_compositing
-        had_comp_tree: bool = scene.compositing_node_group is not None
-    else:
-        had_compositing = getattr(scene, 'use_nodes', False)
-        had_comp_tree = scene.node_tree is not None
-
-    cache: dict[str, object] = {
-        "render_engine": scene.render.engine,
-        "film_transparent": scene.render.film_transparent,
-        "use_pass_normal": vl.use_pass_normal,
-        "use_pass_z": vl.use_pass_z,
-        "use_pass_diffuse_color": vl.use_pass_diffuse_color,
-        "use_pass_glossy_color": vl.use_pass_glossy_color,
-        "use_pass_ambient_occlusion": vl.use_pass_ambient_occlusion,
-        "had_compositing": had_compositing,
-        "had_comp_tree": had_comp_tree,
-    }
-
-    # --- 2. Render settings ---
-    scene.render.engine = 'CYCLES'
-    scene.render.film_transparent = True
-    vl.use_pass_normal = True
-    vl.use_pass_z = True
-    vl.use_pass_diffuse_color = True
-    vl.use_pass_glossy_color = True
-    vl.use_pass_ambient_occlusion = True
-
-    # --- 3. View-layer AOVs ---
-    aovs_exist: bool = any(aov.name.startswith("QG_AOV") for aov in vl.aovs)
-    if not aovs_exist:
-        for aov_name, aov_type in _QG_AOV_DEFS:
-            aov: bpy.types.AOV = vl.aovs.add()
+    cache = _QGCache(
+        render_engine=render.engine,
+        film_transparent=render.film_transparent,
+        **{flag: getattr(vl, flag) for flag in _QG_VL_PASS_FLAGS},
+        had_compositing=(
+            render.use_compositing if _HAS_COMP_NODE_GROUP
+            else getattr(scene, 'use_nodes', False)),
+        had_comp_tree=_get_compositor_tree(scene) is not None,
+    )
+
+    # If any step fails, undo the partial setup here: callers only receive
+    # the cache on success and restore_quadgrab() ignores a missing one.
+    try:
+        # --- 2. Render settings ---
+        # Skip writes that are already in place (e.g. a repeated Setup) so
+        # they don't each tag a depsgraph update.
+        _set_if_changed(render, 'engine', 'CYCLES')
+        _set_if_changed(render, 'film_transparent', True)
+        for flag in _QG_VL_PASS_FLAGS:
+            _set_if_changed(vl, flag, True)
+
+        # --- 3. View-layer AOVs ---
+        # Add only the QG AOVs that are missing, so a partial earlier setup is
+        # completed rather than skipped.
+        aovs = vl.aovs
+        existing_aov_names: set[str] = {aov.name for aov in aovs}
+        for aov_name, aov_type in _QG_AOV_DEFS.items():
+            if aov_name in existing_aov_names:
+                continue
+            aov: bpy.types.AOV = aovs.add()
             aov.name = aov_name
             aov.type = aov_type
 
-    # --- 4. Material AOV nodes (PBR mode only) ---
-    skipped_linked: int = 0
-    if getattr(scene, properties.PROP_USE_PBR, False):
-        _updated, skipped_linked = setup_pbr_aovs_mats()
+        # --- 4. Material AOV nodes (PBR mode only) ---
+        # Restore only needs to visit the materials that carry QG AOV nodes,
+        # but that set is only known when the materials were just patched.
+        # Without PBR the registry stays None so restore scans every material
+        # (a persisted earlier setup may have left QG_AOV nodes behind).
+        skipped_linked: int = 0
+        if getattr(scene, _PROP_USE_PBR_NAME, False):
+            patched, skipped_linked, _unchanged = setup_pbr_aovs_mats()
+            cache = cache._replace(
+                qg_patched_materials=_merge_patched_materials(scene, patched))
 
-    # --- 5. Compositor graph ---
-    build_comp_graph(timestamp=timestamp)
+        # --- 5. Compositor graph ---
+        build_comp_graph(timestamp=timestamp)
+    except BaseException:
+        restore_quadgrab(scene, vl, cache, force=True)
+        raise
 
     return cache, skipped_linked
 
@@ -99,7 +210,8 @@ def apply_quadgrab_setup(
 def restore_quadgrab(
     scene: bpy.types.Scene,
     vl: bpy.types.ViewLayer,
-    cache: dict[str, object],
+    cache: _QGCache | None,
+    force: bool = False,
 ) -> None:
     """Restore scene render settings and remove all QG_ scene modifications.
 
@@ -109,51 +221,88 @@ def restore_quadgrab(
     Does **not** remove QuadGrab objects, images, or textures — those are
     managed by the caller (camera removed in atomic mode; preview plane and
     output images are intentionally kept).
+
+    With ``cache=None`` no setup was applied, so nothing is done unless
+    *force* is set; the manual Cleanup operator forces it to remove QG_
+    nodes and AOVs left by an unknown earlier setup.  *force* also makes
+    the material pass scan every local material rather than only those
+    the cache recorded.
     """
+    if cache is None and not force:
+        return
+
+    render: bpy.types.RenderSettings = scene.render
+
     # --- 1. Restore render settings ---
-    if cache:
-        scene.render.engine = str(
-            cache.get("render_engine", scene.render.engine))
-        scene.render.film_transparent = bool(
-            cache.get("film_transparent", scene.render.film_transparent))
-        vl.use_pass_normal = bool(
-            cache.get("use_pass_normal", vl.use_pass_normal))
-        vl.use_pass_z = bool(cache.get("use_pass_z", vl.use_pass_z))
-        vl.use_pass_diffuse_color = bool(
-            cache.get("use_pass_diffuse_color", vl.use_pass_diffuse_color))
-        vl.use_pass_glossy_color = bool(
-            cache.get("use_pass_glossy_color", vl.use_pass_glossy_color))
-        vl.use_pass_ambient_occlusion = bool(
-            cache.get("use_pass_ambient_occlusion", vl.use_pass_ambient_occlusion))
-
-    # --- 2. Remove QG_ compositor nodes and restore compositing state ---
-    compgraph: bpy.types.CompositorNodeTree | None = _get_compositor_tree(
-        scene)
-    if compgraph is not None:
-        for node in list(compgraph.nodes):
-            if node.name.startswith(_QG_NODE_PREFIX):
-                compgraph.nodes.remove(node)
-        if cache:
-            had_compositing: bool = bool(cache.get("had_compositing", True))
-            had_comp_tree: bool = bool(cache.get("had_comp_tree", True))
-            if hasattr(scene, 'compositing_node_group'):
-                scene.render.use_compositing = had_compositing
-                if not had_comp_tree:
-                    scene.compositing_node_group = None
-            else:
-                scene.use_nodes = had_compositing
-
-    # --- 3. Remove QG_ view-layer AOVs ---
-    for aov in list(vl.aovs):
-        if aov.name.startswith("QG_AOV"):
-            vl.aovs.remove(aov)
-
-    # --- 4. Remove QG_ material AOV nodes (local materials only) ---
-    for mat in bpy.data.materials:
-        if mat.library is not None:
-            continue  # linked — read-only node tree
-        if mat.node_tree is None:
-            continue
-        for node in list(mat.node_tree.nodes):
-            if node.name.startswith("QG_AOV"):
-                mat.node_tree.nodes.remove(node)
+    if cache is not None:
+        _set_if_changed(render, 'engine', cache.render_engine)
+        _set_if_changed(render, 'film_transparent', cache.film_transparent)
+        for flag in _QG_VL_PASS_FLAGS:
+            _set_if_changed(vl, flag, getattr(cache, flag))
+
+    # Steps 2-4 are a burst of RNA removals around short-lived lists; pause
+    # the cyclic GC for the burst and re-enable it only if it was on before.
+    gc_was_enabled: bool = gc.isenabled()
+    gc.disable()
+    try:
+        # --- 2. Remove QG_ compositor nodes and restore compositing state ---
+        compgraph: bpy.types.CompositorNodeTree | None = _get_compositor_tree(
+            scene)
+        if compgraph is not None:
+            nodes = compgraph.nodes
+            qg_nodes: list[bpy.types.Node] = [
+                n for n in nodes if n.name.startswith(_QG_NODE_PREFIX)]
+            for n in qg_nodes:
+                nodes.remove(n)
+            if cache is not None:
+                if _HAS_COMP_NODE_GROUP:
+                    _set_if_changed(
+                        render, 'use_compositing', cache.had_compositing)
+                    if not cache.had_comp_tree:
+                        scene.compositing_node_group = None
+                else:
+                    _set_if_changed(scene, 'use_nodes', cache.had_compositing)
+
+        # --- 3. Remove QG_ view-layer AOVs ---
+        aovs = vl.aovs
+        stale_aovs: list[bpy.types.AOV] = [
+            aov for aov in aovs if aov.name in _QG_AOV_DEFS]
+        for aov in stale_aovs:
+            aovs.remove(aov)
+
+        # --- 4. Remove QG_ material AOV nodes (local materials only) ---
+        # The atomic QuadGrab visits just the materials Setup patched when the
+        # cache records them.  A forced Cleanup, older or missing caches, and
+        # a recorded material that can no longer be found (e.g. renamed since
+        # Setup) scan every material instead: copies of a patched material
+        # made after Setup carry QG_AOV nodes too.  Linked materials have
+        # read-only node trees, hence the (name, None) lookup.
+        patched = (cache.qg_patched_materials
+                   if cache is not None and not force else None)
+        local_trees: list[bpy.types.NodeTree] | None = None
+        if patched is not None:
+            materials_get = bpy.data.materials.get
+            local_trees = []
+            for name in patched:
+                mat = materials_get((name, None))
+                if mat is None:
+                    local_trees = None
+                    break
+                if mat.node_tree is not None:
+                    local_trees.append(mat.node_tree)
+        if local_trees is None:
+            local_trees = [
+                mat.node_tree for mat in bpy.data.materials
+                if mat.library is None and mat.node_tree is not None]
+        for nt in local_trees:
+            # One pass over the nodes; most materials have nothing to remove.
+            nodes = nt.nodes
+            to_remove: list[bpy.types.Node] = [
+                node for node in nodes if node.name.startswith(_QG_AOV_PREFIX)]
+            if to_remove:
+                nodes_remove = nodes.remove
+                for node in to_remove:
+                    nodes_remove(node)
+    finally:
+        if gc_was_enabled:
+            gc.enable()